@@ -0,0 +1,30 @@
+"""store paper embeddings
+
+Revision ID: 0002_paper_embeddings
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002_paper_embeddings"
+down_revision: Union[str, None] = "0001_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("papers", sa.Column("embedding", sa.LargeBinary(), nullable=True))
+    op.add_column("papers", sa.Column("embedding_model", sa.String(), nullable=True))
+    op.add_column("papers", sa.Column("embedding_hash", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("papers") as batch_op:
+        batch_op.drop_column("embedding_hash")
+        batch_op.drop_column("embedding_model")
+        batch_op.drop_column("embedding")
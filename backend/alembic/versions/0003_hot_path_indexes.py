@@ -0,0 +1,37 @@
+"""indexes for hot query paths and per-workspace paper dedupe
+
+Revision ID: 0003_hot_path_indexes
+Revises: 0002_paper_embeddings
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0003_hot_path_indexes"
+down_revision: Union[str, None] = "0002_paper_embeddings"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fails if a workspace already holds the same external_id twice; remove those rows first
+    op.create_index(
+        "uq_papers_workspace_external_id", "papers", ["workspace_id", "external_id"], unique=True
+    )
+    op.create_index(
+        "ix_messages_conversation_created", "messages", ["conversation_id", "created_at"]
+    )
+    op.create_index(
+        "ix_conversations_workspace_created", "conversations", ["workspace_id", "created_at"]
+    )
+    op.create_index("ix_workspaces_owner_id", "workspaces", ["owner_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_workspaces_owner_id", table_name="workspaces")
+    op.drop_index("ix_conversations_workspace_created", table_name="conversations")
+    op.drop_index("ix_messages_conversation_created", table_name="messages")
+    op.drop_index("uq_papers_workspace_external_id", table_name="papers")
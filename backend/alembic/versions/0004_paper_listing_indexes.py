@@ -0,0 +1,26 @@
+"""indexes for keyset pagination of workspace papers
+
+Revision ID: 0004_paper_listing_indexes
+Revises: 0003_hot_path_indexes
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0004_paper_listing_indexes"
+down_revision: Union[str, None] = "0003_hot_path_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_papers_workspace_id", "papers", ["workspace_id", "id"])
+    op.create_index("ix_papers_workspace_year", "papers", ["workspace_id", "year", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_papers_workspace_year", table_name="papers")
+    op.drop_index("ix_papers_workspace_id", table_name="papers")
@@ -0,0 +1,73 @@
+"""full-text index over papers (SQLite FTS5)
+
+Revision ID: 0005_papers_fts
+Revises: 0004_paper_listing_indexes
+Create Date: 2026-10-17 00:00:00
+
+An external-content FTS5 table: it stores only the index and reads the text
+from `papers`, kept in sync by the triggers below. workspace_id is indexed too
+so a `workspace_id:N` term restricts a match to one library.
+
+Batch-mode migrations on `papers` recreate the table and drop its triggers;
+such a migration must recreate them (see create_triggers) and rebuild the index.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0005_papers_fts"
+down_revision: Union[str, None] = "0004_paper_listing_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "title, authors, abstract, workspace_id"
+
+TRIGGERS = {
+    "papers_fts_ai": f"""
+        CREATE TRIGGER papers_fts_ai AFTER INSERT ON papers BEGIN
+            INSERT INTO papers_fts(rowid, {COLUMNS})
+            VALUES (new.id, new.title, new.authors, new.abstract, new.workspace_id);
+        END""",
+    "papers_fts_ad": f"""
+        CREATE TRIGGER papers_fts_ad AFTER DELETE ON papers BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, {COLUMNS})
+            VALUES ('delete', old.id, old.title, old.authors, old.abstract, old.workspace_id);
+        END""",
+    # Only text changes; embedding updates must not churn the index
+    "papers_fts_au": f"""
+        CREATE TRIGGER papers_fts_au AFTER UPDATE OF {COLUMNS} ON papers BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, {COLUMNS})
+            VALUES ('delete', old.id, old.title, old.authors, old.abstract, old.workspace_id);
+            INSERT INTO papers_fts(rowid, {COLUMNS})
+            VALUES (new.id, new.title, new.authors, new.abstract, new.workspace_id);
+        END""",
+}
+
+
+def create_triggers() -> None:
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(
+        f"""CREATE VIRTUAL TABLE papers_fts USING fts5(
+            {COLUMNS},
+            content='papers', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )"""
+    )
+    create_triggers()
+    # Index the papers that already exist
+    op.execute("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS papers_fts")
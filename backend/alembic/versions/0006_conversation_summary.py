@@ -0,0 +1,28 @@
+"""rolling summary of older chat turns on conversations
+
+Revision ID: 0006_conversation_summary
+Revises: 0005_papers_fts
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006_conversation_summary"
+down_revision: Union[str, None] = "0005_papers_fts"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column("conversations", sa.Column("summary_message_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("conversations") as batch_op:
+        batch_op.drop_column("summary_message_id")
+        batch_op.drop_column("summary")
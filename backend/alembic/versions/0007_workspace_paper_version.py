@@ -0,0 +1,27 @@
+"""monotonic version of each workspace's paper set
+
+Revision ID: 0007_workspace_paper_version
+Revises: 0006_conversation_summary
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007_workspace_paper_version"
+down_revision: Union[str, None] = "0006_conversation_summary"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Embedding stores written before this have no version, so each is rebuilt once on first use
+    op.add_column("workspaces", sa.Column("paper_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("workspaces") as batch_op:
+        batch_op.drop_column("paper_version")
@@ -1,16 +1,17 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 import os
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
 from dotenv import load_dotenv
 
-from .database import get_db
+from .database import open_session
 from . import models
+from .utils.password_hashing import pwd_context
+from .utils.principal_cache import principal_cache
 
 load_dotenv()
 
@@ -18,10 +19,10 @@ SECRET_KEY = os.getenv("SECRET_KEY", "changeme-use-a-real-secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+# Synchronous helpers for scripts; request handlers use the PasswordHasher pool instead
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -37,10 +38,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.User:
+class UserPrincipal(NamedTuple):
+    """Authenticated user as seen by the routers: a detached, immutable snapshot of the row."""
+    id: int
+    email: str
+    username: str
+    created_at: datetime
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,7 +64,21 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
-    if user is None:
+    # Only reached on a cache miss, so requests that don't need the database never open a session
+    async with open_session() as db:
+        row = (await db.execute(select(
+            models.User.id, models.User.email, models.User.username, models.User.created_at
+        ).where(models.User.id == int(user_id)))).first()
+    if row is None:
         raise credentials_exception
-    return user
+    principal = UserPrincipal(*row)
+    # Tokens without an expiry are still accepted, but never cached (the cache cannot bound their lifetime)
+    if isinstance(payload.get("exp"), (int, float)):
+        principal_cache.put(token, principal, payload["exp"])
+    return principal
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_principal(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
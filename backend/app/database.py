@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 
@@ -8,19 +13,191 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////app/researchhub.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# Request handlers use AsyncSession (aiosqlite/asyncpg); DB_ASYNC=false serves them from the
+# sync engine on the threadpool instead. Scripts and Alembic always use the sync engine.
+DB_ASYNC = os.getenv("DB_ASYNC", "true").lower() == "true"
+
+# "production" turns on WAL and the pragmas below for SQLite; "default" keeps the driver defaults
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _apply_sqlite_production_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: readers no longer block on writers, and a commit appends to the log instead of
+    # rewriting pages; NORMAL only fsyncs at checkpoints, which is still durable against
+    # application crashes (a power loss may drop the last few commits, never corrupt the file)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # Wait for a competing writer (e.g. another uvicorn worker) instead of failing with "database is locked"
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, sqlite_profile: str = SQLITE_PROFILE) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+    if sqlite_profile != "production" or ":memory:" in url:
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        # Connections are cheap but their page cache and mmap are not; keep them around
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    event.listen(engine, "connect", _apply_sqlite_production_pragmas)
+    return engine
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync URL to its async driver: sqlite -> aiosqlite, postgresql -> asyncpg."""
+    scheme, sep, rest = url.partition("://")
+    driver = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+    return driver.get(scheme, scheme) + sep + rest
+
+
+def create_async_db_engine(url: str = DATABASE_URL, sqlite_profile: str = SQLITE_PROFILE) -> AsyncEngine:
+    async_url = async_database_url(url)
+    if not url.startswith("sqlite"):
+        return create_async_engine(
+            async_url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+    if ":memory:" in url:
+        return create_async_engine(async_url, connect_args={"check_same_thread": False})
+    if sqlite_profile != "production":
+        # aiosqlite defaults to NullPool, i.e. a new connection (and thread) per session
+        return create_async_engine(
+            async_url, connect_args={"check_same_thread": False}, poolclass=AsyncAdaptedQueuePool
+        )
+
+    engine = create_async_engine(
+        async_url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    event.listen(engine.sync_engine, "connect", _apply_sqlite_production_pragmas)
+    return engine
+
+
+# Always built (Alembic, scripts and run_in_sync_session need it): PostgreSQL needs psycopg2 as well as asyncpg
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine() if DB_ASYNC else None
+
+# Objects stay usable after commit: reloading expired attributes would need another await
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if DB_ASYNC else None
+)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+class SyncSessionAdapter:
+    """
+    The subset of the AsyncSession API the routers use, backed by a sync
+    Session whose calls run on the threadpool (DB_ASYNC=false).
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None):
+        def run():
+            result = self.sync_session.execute(statement, params)
+            # Buffer rows like AsyncSession does, so iterating never touches the cursor on the event loop
+            return result.freeze()() if getattr(result, "returns_rows", True) else result
+        return await run_in_threadpool(run)
+
+    async def scalar(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params)
+
+    async def scalars(self, statement, params=None):
+        return (await self.execute(statement, params)).scalars()
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+@asynccontextmanager
+async def open_session():
+    """An AsyncSession, or a SyncSessionAdapter when DB_ASYNC is off."""
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        session = SyncSessionAdapter(SessionLocal(expire_on_commit=False))
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def get_db():
+    async with open_session() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def run_in_sync_session(fn, *args):
+    """
+    Run fn(session, *args) on the threadpool with a short-lived sync session,
+    for CPU- or file-heavy work (vector index rebuilds) that must stay off the
+    event loop. Returned ORM objects are detached but fully loaded.
+    """
+    def run():
+        with SessionLocal() as session:
+            return fn(session, *args)
+    return await run_in_threadpool(run)
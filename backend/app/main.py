@@ -1,18 +1,43 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from .database import engine
-from . import models
+from .auth import UserPrincipal, get_current_user
 from .routers import auth_router, workspace_router, paper_router, chat_router
+from .utils.embedding_service import create_embedding_service, close_embedding_service
+from .utils.http_client import create_http_client, close_http_client, get_http_client
+from .utils.llm import create_llm_client, close_llm_client
+from .utils.metrics import CONTENT_TYPE, RequestMetricsMiddleware, registry
+from .utils.password_hashing import create_password_hasher, close_password_hasher
+from .utils.structured_logging import configure_logging
+from .utils.warmup import readiness
+
+configure_logging()
+
+# The schema is managed by Alembic migrations (`alembic upgrade head`), not at startup
 
-# Create all database tables
-models.Base.metadata.create_all(bind=engine)
 
-# Define database URL (as per instruction to update/define database path)
-appDATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./researchhub.db")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled LLM and outbound HTTP clients for the lifetime of the worker
+    create_llm_client()
+    create_http_client()
+    create_password_hasher()
+    create_embedding_service()
+    # Load models and open connections now instead of on the first request (see WARMUP_MODE)
+    await readiness.start()
+    yield
+    await readiness.stop()
+    await close_embedding_service()
+    close_password_hasher()
+    await close_http_client()
+    await close_llm_client()
+
 
 app = FastAPI(
     title="ResearchHub AI",
@@ -20,17 +45,11 @@ app = FastAPI(
     version="1.0.0",
     contact={
         "name": "ResearchHub AI Team",
-    }
+    },
+    lifespan=lifespan,
 )
 
-# ─── Request Logging & CORS ──────────────────────────────────────────────────
-@app.middleware("http")
-async def log_requests(request, call_next):
-    print(f"Incoming: {request.method} {request.url}")
-    response = await call_next(request)
-    print(f"Outgoing: {response.status_code}")
-    return response
-
+# ─── CORS & Request Metrics ──────────────────────────────────────────────────
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,6 +57,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it is outermost: latency includes CORS, and every request gets an access-log line
+app.add_middleware(RequestMetricsMiddleware)
 
 # ─── Routers ─────────────────────────────────────────────────────────────────
 app.include_router(auth_router.router)
@@ -59,3 +80,21 @@ def root():
 @app.get("/health", tags=["Health"])
 def health():
     return {"status": "healthy"}
+
+
+@app.get("/ready", tags=["Health"])
+def ready():
+    """Readiness probe: 503 until startup warmup has finished (liveness is /health)."""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/health/outbound", tags=["Health"])
+def outbound_health(current_user: UserPrincipal = Depends(get_current_user)):
+    """Connection and retry counters of the shared outbound HTTP client."""
+    return get_http_client().metrics()
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Prometheus metrics of this worker (requests, chat stages, LLM tokens, caches, queues)."""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
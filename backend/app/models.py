@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -23,7 +23,9 @@ class Workspace(Base):
     name = Column(String, nullable=False)
     description = Column(Text, default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Bumped in the same transaction as every paper import or delete; versions the vector index and answer cache
+    paper_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     owner = relationship("User", back_populates="workspaces")
     papers = relationship("Paper", back_populates="workspace", cascade="all, delete-orphan")
@@ -32,6 +34,13 @@ class Workspace(Base):
 
 class Paper(Base):
     __tablename__ = "papers"
+    __table_args__ = (
+        # Per-workspace dedupe; also serves every workspace_id lookup
+        Index("uq_papers_workspace_external_id", "workspace_id", "external_id", unique=True),
+        # Keyset pagination of a workspace's papers by import order and by year
+        Index("ix_papers_workspace_id", "workspace_id", "id"),
+        Index("ix_papers_workspace_year", "workspace_id", "year", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -42,6 +51,9 @@ class Paper(Base):
     url = Column(String, nullable=True)
     source = Column(String, default="openalex") # openalex | semantic_scholar
     external_id = Column(String, nullable=True)
+    embedding = Column(LargeBinary, nullable=True)          # float32 bytes, L2-normalized
+    embedding_model = Column(String, nullable=True)         # model that produced `embedding`
+    embedding_hash = Column(String, nullable=True)          # sha256 of the embedded text
     imported_at = Column(DateTime(timezone=True), server_default=func.now())
     workspace_id = Column(Integer, ForeignKey("workspaces.id"), nullable=False)
 
@@ -50,11 +62,16 @@ class Paper(Base):
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_workspace_created", "workspace_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, default="New Conversation")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     workspace_id = Column(Integer, ForeignKey("workspaces.id"), nullable=False)
+    summary = Column(Text, nullable=True)                   # rolling summary of the folded-away turns
+    summary_message_id = Column(Integer, nullable=True)     # last message covered by `summary`
 
     workspace = relationship("Workspace", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -62,6 +79,9 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     role = Column(String, nullable=False)       # "user" | "assistant"
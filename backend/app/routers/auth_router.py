@@ -1,43 +1,70 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
 from .. import models, schemas
-from ..auth import hash_password, verify_password, create_access_token, get_current_user
+from ..auth import UserPrincipal, create_access_token, get_current_user
+from ..utils.password_hashing import PasswordHasher, get_password_hasher
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
-    if db.query(models.User).filter(models.User.email == user_data.email).first():
+async def register(
+    user_data: schemas.UserCreate,
+    db: AsyncSession = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_password_hasher)
+):
+    if await db.scalar(select(models.User.id).where(models.User.email == user_data.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
-    if db.query(models.User).filter(models.User.username == user_data.username).first():
+    if await db.scalar(select(models.User.id).where(models.User.username == user_data.username)):
         raise HTTPException(status_code=400, detail="Username already taken")
 
     user = models.User(
         email=user_data.email,
         username=user_data.username,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=await hasher.hash(user_data.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.hashed_password):
+async def login(
+    credentials: schemas.LoginRequest,
+    db: AsyncSession = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_password_hasher)
+):
+    user = (await db.execute(select(models.User.id, models.User.hashed_password).where(
+        models.User.email == credentials.email
+    ))).first()
+    valid, new_hash = (await hasher.verify(credentials.password, user.hashed_password)) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
+    if new_hash is not None:
+        # Stored hash used a different cost factor; upgrade it now that we know the password
+        stored = await db.get(models.User, user.id)
+        stored.hashed_password = new_hash
+        await db.commit()
     token = create_access_token(data={"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
+@router.get("/hashing/stats")
+def password_hashing_stats(
+    hasher: PasswordHasher = Depends(get_password_hasher),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    """Queue and throughput metrics of the password hashing pool in this worker."""
+    return hasher.metrics()
+
+
 @router.get("/me", response_model=schemas.UserOut)
-def get_me(current_user: models.User = Depends(get_current_user)):
+async def get_me(current_user: UserPrincipal = Depends(get_current_user)):
     return current_user
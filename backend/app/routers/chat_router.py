@@ -1,167 +1,461 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+import asyncio
+import json
 import os
+import time
 
-from ..database import get_db
+from ..database import get_db, open_session
 from .. import models, schemas
-from ..auth import get_current_user
-from ..utils.research_assistant import get_relevant_papers, build_system_prompt
+from ..auth import UserPrincipal, get_current_user
+from ..utils.answer_cache import answer_cache
+from ..utils.chat_context import count_tokens, load_history, pack_prompt, update_summary
+from ..utils.embedding_service import encode_query_async
+from ..utils.llm import LLM_MODEL, get_llm_client
+from ..utils.metrics import observe_chat_timings, record_llm_call
+from ..utils.pagination import decode_cursor, encode_cursor
+from ..utils.retrieval import retrieval_options, retrieve
+from ..utils.vector_index import workspace_version
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+PREVIEW_CHARS = 120
+# Ranked papers offered to the prompt packer; the token budget decides how many are used
+CHAT_MAX_PAPERS = int(os.getenv("CHAT_MAX_PAPERS", "8"))
 
-def get_groq_client():
+
+@contextmanager
+def _stage(timings_ms: dict, stage: str):
+    started = time.perf_counter()
     try:
-        from groq import Groq
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY not set in environment")
-        return Groq(api_key=api_key)
-    except ImportError:
-        raise HTTPException(status_code=500, detail="Groq library not installed")
+        yield
+    finally:
+        timings_ms[stage] = round((time.perf_counter() - started) * 1000, 2)
 
 
-@router.post("/", response_model=schemas.ChatResponse)
-def chat(
-    req: schemas.ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def _start_conversation(
+    req: schemas.ChatRequest, db: AsyncSession, current_user: UserPrincipal, timings_ms: dict
 ):
+    """
+    Validate workspace ownership, get or create the conversation, load its
+    recent history and persist the user's message. Returns (conversation, history).
+    """
     # Validate workspace ownership
-    workspace = db.query(models.Workspace).filter(
-        models.Workspace.id == req.workspace_id,
-        models.Workspace.owner_id == current_user.id
-    ).first()
+    with _stage(timings_ms, "workspace"):
+        workspace = await db.scalar(select(models.Workspace.id).where(
+            models.Workspace.id == req.workspace_id,
+            models.Workspace.owner_id == current_user.id
+        ))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     # Get or create conversation
-    if req.conversation_id:
-        conversation = db.query(models.Conversation).filter(
-            models.Conversation.id == req.conversation_id,
-            models.Conversation.workspace_id == req.workspace_id,
-        ).first()
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-    else:
-        # Create new conversation with title from first message
-        title = req.message[:60] + "..." if len(req.message) > 60 else req.message
-        conversation = models.Conversation(
-            title=title,
-            workspace_id=req.workspace_id
+    with _stage(timings_ms, "conversation"):
+        if req.conversation_id:
+            conversation = await db.scalar(select(models.Conversation).where(
+                models.Conversation.id == req.conversation_id,
+                models.Conversation.workspace_id == req.workspace_id,
+            ))
+        else:
+            # Create new conversation with title from first message
+            title = req.message[:60] + "..." if len(req.message) > 60 else req.message
+            conversation = models.Conversation(
+                title=title,
+                workspace_id=req.workspace_id
+            )
+            db.add(conversation)
+            await db.commit()
+            await db.refresh(conversation)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    # Most recent turns not yet folded into the conversation summary
+    with _stage(timings_ms, "history"):
+        history = await load_history(db, conversation)
+
+    # Save user message
+    with _stage(timings_ms, "commit_message"):
+        user_msg = models.Message(
+            role="user",
+            content=req.message,
+            conversation_id=conversation.id
         )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        db.add(user_msg)
+        await db.commit()
 
-    # Get all papers in workspace for RAG context
-    papers = db.query(models.Paper).filter(
-        models.Paper.workspace_id == req.workspace_id
-    ).all()
+    return conversation, history
 
-    # Find the most relevant papers using embeddings
-    relevant_papers = get_relevant_papers(req.message, papers, top_k=5)
 
-    # Build system prompt with context
-    system_prompt = build_system_prompt(relevant_papers)
+async def _save_reply(db: AsyncSession, conversation_id: int, reply: str) -> int:
+    assistant_msg = models.Message(
+        role="assistant",
+        content=reply,
+        conversation_id=conversation_id
+    )
+    db.add(assistant_msg)
+    await db.commit()
+    return assistant_msg.id
 
-    # Build conversation history (last 10 messages)
-    history = db.query(models.Message).filter(
-        models.Message.conversation_id == conversation.id
-    ).order_by(models.Message.created_at).limit(10).all()
 
-    messages = [{"role": "system", "content": system_prompt}]
-    for msg in history:
-        messages.append({"role": msg.role, "content": msg.content})
-    messages.append({"role": "user", "content": req.message})
+class _ChatTurn:
+    """Result of the pre-LLM stage of a chat turn."""
 
-    # Save user message
-    user_msg = models.Message(
-        role="user",
-        content=req.message,
-        conversation_id=conversation.id
-    )
-    db.add(user_msg)
-    db.commit()
+    def __init__(
+        self, conversation_id: int, messages: list = None, cached_reply: str = None,
+        cache_key: tuple = None, timings_ms: dict = None, prompt_tokens: int = None,
+    ):
+        self.conversation_id = conversation_id
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.cached_reply = cached_reply
+        # (workspace_id, paper-set version, retrieval settings, message, query embedding) if the reply may be cached
+        self.cache_key = cache_key
+        self.timings_ms = timings_ms or {}
 
-    # Call Groq
-    try:
-        client = get_groq_client()
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1024,
+    def remember(self, reply: str):
+        if self.cache_key is not None and self.cached_reply is None:
+            answer_cache.store(*self.cache_key, reply)
+
+    def record_llm(self, outcome: str, reply: str = "", usage=None):
+        """Export the "llm" stage and token counts; estimated from the text if the API sent no usage."""
+        if outcome == "error" and not reply:
+            record_llm_call("chat", self.timings_ms["llm"] / 1000, outcome)
+            return
+        record_llm_call(
+            "chat", self.timings_ms["llm"] / 1000, outcome,
+            prompt_tokens=usage.prompt_tokens if usage else self.prompt_tokens,
+            completion_tokens=usage.completion_tokens if usage else count_tokens(reply),
         )
-        reply = completion.choices[0].message.content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI inference failed: {str(e)}")
 
-    # Save assistant message
-    assistant_msg = models.Message(
-        role="assistant",
-        content=reply,
-        conversation_id=conversation.id
+
+async def _encode_timed(message: str, timings_ms: dict):
+    with _stage(timings_ms, "encode"):
+        return await encode_query_async(message)
+
+
+async def _prepare_chat(req: schemas.ChatRequest, db: AsyncSession, current_user: UserPrincipal) -> _ChatTurn:
+    """
+    Run the pre-LLM part of a chat turn without blocking the event loop:
+    query encoding on the embedding executor (concurrently with the
+    conversation lookup), then paper retrieval in the requested mode and
+    packing of the prompt into the token budget. Opening questions are
+    answered from the semantic answer cache when possible.
+    """
+    timings_ms = {}
+    query_task = asyncio.ensure_future(_encode_timed(req.message, timings_ms))
+    try:
+        conversation, history = await _start_conversation(req, db, current_user, timings_ms)
+    except Exception:
+        query_task.cancel()
+        raise
+    query_embedding = await query_task
+    conversation_id = conversation.id
+
+    mode, rerank = retrieval_options(req.retrieval, req.rerank)
+    cache_key = None
+    if answer_cache.enabled and not history and not conversation.summary and query_embedding is not None:
+        # Different retrieval settings put different papers in the prompt, so they are part of the key
+        version = await db.run_sync(workspace_version, req.workspace_id)
+        cache_key = (req.workspace_id, version, (mode, rerank), req.message, query_embedding)
+        cached_reply = answer_cache.lookup(*cache_key)
+        if cached_reply is not None:
+            return _ChatTurn(conversation_id, cached_reply=cached_reply, cache_key=cache_key, timings_ms=timings_ms)
+
+    # Find the most relevant papers (vector index, FTS5 or both)
+    retrieval = await retrieve(db, req.workspace_id, req.message, query_embedding, CHAT_MAX_PAPERS, mode, rerank)
+    timings_ms.update(retrieval.timings_ms)
+    # Retrieval's own "total" would read as the whole turn's
+    timings_ms["retrieval"] = timings_ms.pop("total")
+
+    # System prompt, recent turns and as many paper passages as fit the token budget
+    with _stage(timings_ms, "pack"):
+        packed = pack_prompt(retrieval.papers, history, req.message, conversation.summary)
+    return _ChatTurn(
+        conversation_id, packed.messages, cache_key=cache_key, timings_ms=timings_ms,
+        prompt_tokens=packed.prompt_tokens,
     )
-    db.add(assistant_msg)
-    db.commit()
+
+
+@router.post("/", response_model=schemas.ChatResponse)
+async def chat(
+    req: schemas.ChatRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user),
+    client=Depends(get_llm_client),
+):
+    turn = await _prepare_chat(req, db, current_user)
+
+    if turn.cached_reply is not None:
+        reply = turn.cached_reply
+    else:
+        # Call Groq
+        try:
+            with _stage(turn.timings_ms, "llm"):
+                completion = await client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=turn.messages,
+                    temperature=0.3,
+                    max_tokens=1024,
+                )
+            reply = completion.choices[0].message.content
+        except Exception as e:
+            turn.record_llm("error")
+            observe_chat_timings(turn.timings_ms)
+            raise HTTPException(status_code=500, detail=f"AI inference failed: {str(e)}")
+        turn.record_llm("ok", reply, getattr(completion, "usage", None))
+        turn.remember(reply)
+
+    # Save assistant message
+    with _stage(turn.timings_ms, "commit_reply"):
+        await _save_reply(db, turn.conversation_id, reply)
+    observe_chat_timings(turn.timings_ms)
+    # Fold turns that no longer fit the history budget once the response is sent
+    background_tasks.add_task(update_summary, turn.conversation_id, client)
 
     return schemas.ChatResponse(
-        conversation_id=conversation.id,
-        reply=reply
+        conversation_id=turn.conversation_id,
+        reply=reply,
+        timings_ms=turn.timings_ms,
+        prompt_tokens=turn.prompt_tokens,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _save_reply_in_new_session(conversation_id: int, reply: str) -> int:
+    # The request-scoped session is closed once streaming starts
+    async with open_session() as session:
+        return await _save_reply(session, conversation_id, reply)
+
+
+@router.post("/stream")
+async def chat_stream(
+    req: schemas.ChatRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user),
+    client=Depends(get_llm_client),
+):
+    """
+    Streaming variant of POST /chat/ using Server-Sent Events.
+
+    Events: `conversation` (conversation_id, sent first), `token` (content delta),
+    `done` (conversation_id, message_id, timings_ms, prompt_tokens) once the reply is saved, or `error`.
+    The assistant message is only persisted if the stream runs to completion.
+    A cached answer is sent as a single `token` event.
+    """
+    turn = await _prepare_chat(req, db, current_user)
+    conversation_id = turn.conversation_id
+
+    stream = None
+    llm_started = time.perf_counter()
+    if turn.cached_reply is None:
+        try:
+            stream = await client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=turn.messages,
+                temperature=0.3,
+                max_tokens=1024,
+                stream=True,
+            )
+        except Exception as e:
+            turn.timings_ms["llm"] = round((time.perf_counter() - llm_started) * 1000, 2)
+            turn.record_llm("error")
+            observe_chat_timings(turn.timings_ms)
+            raise HTTPException(status_code=500, detail=f"AI inference failed: {str(e)}")
+
+    async def event_stream():
+        yield _sse("conversation", {"conversation_id": conversation_id})
+        if stream is None:
+            reply = turn.cached_reply
+            yield _sse("token", {"content": reply})
+        else:
+            parts = []
+            usage = None
+            outcome = "error"
+            try:
+                async for chunk in stream:
+                    if await request.is_disconnected():
+                        outcome = "disconnected"
+                        return
+                    # Groq reports usage on the last chunk, under x_groq
+                    x_groq = getattr(chunk, "x_groq", None)
+                    usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if not parts:
+                            turn.timings_ms["llm_first_token"] = round((time.perf_counter() - llm_started) * 1000, 2)
+                        parts.append(delta)
+                        yield _sse("token", {"content": delta})
+                outcome = "ok"
+            except Exception as e:
+                yield _sse("error", {"detail": f"AI inference failed: {str(e)}"})
+                return
+            finally:
+                # Stop the upstream generation if the client went away mid-stream
+                await stream.close()
+                turn.timings_ms["llm"] = round((time.perf_counter() - llm_started) * 1000, 2)
+                turn.record_llm(outcome, "".join(parts), usage)
+                if outcome != "ok":
+                    observe_chat_timings(turn.timings_ms)
+            reply = "".join(parts)
+            turn.remember(reply)
+
+        with _stage(turn.timings_ms, "commit_reply"):
+            message_id = await _save_reply_in_new_session(conversation_id, reply)
+        observe_chat_timings(turn.timings_ms)
+        yield _sse("done", {
+            "conversation_id": conversation_id, "message_id": message_id,
+            "timings_ms": turn.timings_ms, "prompt_tokens": turn.prompt_tokens,
+        })
+
+    # Runs once the stream has finished
+    background_tasks.add_task(update_summary, conversation_id, client)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks,
     )
 
 
-@router.get("/history/{workspace_id}", response_model=List[schemas.ConversationOut])
-def get_conversation_history(
+@router.get("/cache/stats")
+def get_answer_cache_stats(current_user: UserPrincipal = Depends(get_current_user)):
+    """Hit-rate statistics of the semantic answer cache (this worker only)."""
+    return answer_cache.stats()
+
+
+@router.get("/history/{workspace_id}", response_model=schemas.ConversationPage)
+async def get_conversation_history(
     workspace_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    workspace = db.query(models.Workspace).filter(
+    """
+    Newest-first page of conversations with message counts and a preview of the
+    latest message. Costs a constant three queries regardless of page size.
+    """
+    workspace = await db.scalar(select(models.Workspace.id).where(
         models.Workspace.id == workspace_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
+    ))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
-    conversations = db.query(models.Conversation).filter(
-        models.Conversation.workspace_id == workspace_id
-    ).order_by(models.Conversation.created_at.desc()).all()
+    query = select(models.Conversation).where(models.Conversation.workspace_id == workspace_id)
+    if cursor:
+        created_at, conv_id = decode_cursor(cursor, datetime, int)
+        # Rows are append-only, so id order matches created_at order; the
+        # created_at bound keeps this a range seek on the composite index
+        query = query.where(
+            models.Conversation.created_at <= created_at,
+            models.Conversation.id < conv_id,
+        )
+    conversations = (await db.scalars(query.order_by(
+        models.Conversation.created_at.desc(), models.Conversation.id.desc()
+    ).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        next_cursor = encode_cursor(conversations[-1].created_at, conversations[-1].id)
+
+    conv_ids = [c.id for c in conversations]
+    stats = {}
+    previews = {}
+    if conv_ids:
+        stats = {
+            conv_id: (count, last_id)
+            for conv_id, count, last_id in await db.execute(select(
+                models.Message.conversation_id, func.count(models.Message.id), func.max(models.Message.id)
+            ).where(models.Message.conversation_id.in_(conv_ids)).group_by(models.Message.conversation_id))
+        }
+        last_ids = [last_id for _, last_id in stats.values()]
+        previews = {
+            msg_id: (preview, created_at)
+            for msg_id, preview, created_at in await db.execute(select(
+                models.Message.id,
+                func.substr(models.Message.content, 1, PREVIEW_CHARS),
+                models.Message.created_at,
+            ).where(models.Message.id.in_(last_ids)))
+        }
 
-    result = []
+    items = []
     for conv in conversations:
-        messages = [
-            schemas.MessageOut(
-                id=m.id,
-                role=m.role,
-                content=m.content,
-                created_at=m.created_at,
-                conversation_id=m.conversation_id
-            ) for m in conv.messages
-        ]
-        result.append(schemas.ConversationOut(
+        count, last_id = stats.get(conv.id, (0, None))
+        preview, last_at = previews.get(last_id, (None, None))
+        items.append(schemas.ConversationSummary(
             id=conv.id,
             title=conv.title,
             created_at=conv.created_at,
             workspace_id=conv.workspace_id,
-            messages=messages
+            message_count=count,
+            last_message_preview=preview,
+            last_message_at=last_at,
         ))
-    return result
+    return schemas.ConversationPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/conversation/{conversation_id}/messages", response_model=schemas.MessagePage)
+async def get_conversation_messages(
+    conversation_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Most recent messages of a conversation; follow next_cursor to page back in time."""
+    conv = await db.scalar(select(models.Conversation.id).join(models.Workspace).where(
+        models.Conversation.id == conversation_id,
+        models.Workspace.owner_id == current_user.id
+    ))
+    if not conv:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    query = select(models.Message).where(models.Message.conversation_id == conversation_id)
+    if cursor:
+        created_at, msg_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            models.Message.created_at <= created_at,
+            models.Message.id < msg_id,
+        )
+    messages = (await db.scalars(query.order_by(
+        models.Message.created_at.desc(), models.Message.id.desc()
+    ).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+
+    return schemas.MessagePage(
+        items=[schemas.MessageOut.model_validate(m) for m in reversed(messages)],
+        next_cursor=next_cursor,
+    )
 
 
 @router.delete("/conversation/{conversation_id}", status_code=204)
-def delete_conversation(
+async def delete_conversation(
     conversation_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    conv = db.query(models.Conversation).join(models.Workspace).filter(
+    conv = await db.scalar(select(models.Conversation).join(models.Workspace).where(
         models.Conversation.id == conversation_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
+    ))
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    db.delete(conv)
-    db.commit()
+    await db.delete(conv)
+    await db.commit()
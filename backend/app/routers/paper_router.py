@@ -1,19 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import httpx
+from sqlalchemy import and_, nullslast, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional, Union
+from datetime import datetime
 import json
 
+import numpy as np
+
 from ..database import get_db
 from .. import models, schemas
-from ..auth import get_current_user
+from ..auth import UserPrincipal, get_current_user
+from ..utils.answer_cache import answer_cache
+from ..utils.http_client import OutboundHTTPClient, get_http_client
+from ..utils.pagination import decode_cursor, encode_cursor
+from ..utils.paper_search import search_library
+from ..utils.embedding_service import EmbeddingService, embed_papers_async, get_embedding_service
+from ..utils.research_assistant import load_embedding
+from ..utils.search_cache import search_cache, search_key
+from ..utils.vector_index import bump_paper_version, vector_indexes
 
 router = APIRouter(prefix="/papers", tags=["Papers"])
 
 OPENALEX_BASE = "https://api.openalex.org/works"
+BULK_IMPORT_MAX = 500
+# Retries of a bulk insert that lost a unique-index race to a concurrent import
+BULK_IMPORT_CONFLICT_RETRIES = 2
+
+
+async def search_openalex(
+    query: str, http: OutboundHTTPClient, per_page: int = 15
+) -> List[schemas.SearchResult]:
+    """Search OpenAlex, served from the TTL cache and coalesced with identical in-flight searches."""
+    async def fetch():
+        return [r.model_dump() for r in await fetch_openalex(query, http, per_page)]
 
+    results = await search_cache.get_or_fetch(search_key(query, per_page), fetch)
+    return [schemas.SearchResult(**r) for r in results]
 
-async def search_openalex(query: str, per_page: int = 15) -> List[schemas.SearchResult]:
+
+async def fetch_openalex(
+    query: str, http: OutboundHTTPClient, per_page: int = 15
+) -> List[schemas.SearchResult]:
     """Search OpenAlex (free, no API key required)."""
     params = {
         "search": query,
@@ -21,10 +51,9 @@ async def search_openalex(query: str, per_page: int = 15) -> List[schemas.Search
         "select": "id,title,authorships,abstract_inverted_index,publication_year,doi,primary_location",
     }
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(OPENALEX_BASE, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await http.get(OPENALEX_BASE, params=params)
+        resp.raise_for_status()
+        data = resp.json()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"OpenAlex search failed: {str(e)}")
 
@@ -66,31 +95,46 @@ async def search_openalex(query: str, per_page: int = 15) -> List[schemas.Search
 async def search_papers(
     q: str = Query(..., min_length=2, description="Search query"),
     limit: int = Query(15, ge=1, le=50),
-    current_user: models.User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    http: OutboundHTTPClient = Depends(get_http_client),
+):
+    return await search_openalex(q, http, per_page=limit)
+
+
+@router.get("/search/cache/stats")
+def get_search_cache_stats(current_user: UserPrincipal = Depends(get_current_user)):
+    """Hit-rate statistics of the OpenAlex search cache (this worker only)."""
+    return search_cache.stats()
+
+
+@router.get("/embedding/stats")
+def get_embedding_stats(
+    service: EmbeddingService = Depends(get_embedding_service),
+    current_user: UserPrincipal = Depends(get_current_user),
 ):
-    return await search_openalex(q, per_page=limit)
+    """Queue depth, micro-batch sizes and latency of the embedding service (this worker only)."""
+    return service.metrics()
 
 
 @router.post("/import", response_model=schemas.PaperOut, status_code=201)
-def import_paper(
+async def import_paper(
     paper_data: schemas.PaperImport,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     # Verify workspace ownership
-    workspace = db.query(models.Workspace).filter(
+    workspace = await db.scalar(select(models.Workspace.id).where(
         models.Workspace.id == paper_data.workspace_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
+    ))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     # Prevent duplicate imports
-    existing = db.query(models.Paper).filter(
+    if paper_data.external_id and await db.scalar(select(models.Paper.id).where(
         models.Paper.workspace_id == paper_data.workspace_id,
         models.Paper.external_id == paper_data.external_id,
-    ).first()
-    if existing and paper_data.external_id:
+    )):
         raise HTTPException(status_code=409, detail="Paper already in workspace")
 
     paper = models.Paper(
@@ -104,38 +148,272 @@ def import_paper(
         external_id=paper_data.external_id,
         workspace_id=paper_data.workspace_id,
     )
+    # Embed once at import so chat only has to encode the query
+    await embed_papers_async([paper])
     db.add(paper)
-    db.commit()
-    db.refresh(paper)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # A concurrent import of the same paper won the unique index
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Paper already in workspace")
+    version = (await db.execute(bump_paper_version([paper.workspace_id]))).one().paper_version
+    await db.commit()
+    await db.refresh(paper)
+    if paper.embedding is not None:
+        await run_in_threadpool(
+            vector_indexes.add_paper, paper.workspace_id, paper.id, load_embedding(paper), version
+        )
+    answer_cache.invalidate(paper.workspace_id)
     return paper
 
 
-@router.get("/workspace/{workspace_id}", response_model=List[schemas.PaperOut])
-def list_workspace_papers(
+@router.post("/import/bulk", response_model=schemas.BulkImportResponse)
+async def import_papers_bulk(
+    papers_data: List[schemas.PaperImport],
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Import many papers in one transaction. Ownership is checked once, duplicates
+    (by external_id or DOI, against the workspace and within the batch) are found
+    with a single query, and embeddings are computed in one batch. Papers a
+    concurrent import inserted in the meantime are reported as duplicates too.
+    """
+    if len(papers_data) > BULK_IMPORT_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_IMPORT_MAX} papers per request")
+
+    # Verify workspace ownership for every workspace in the batch at once
+    workspace_ids = {p.workspace_id for p in papers_data}
+    owned = set(await db.scalars(select(models.Workspace.id).where(
+        models.Workspace.id.in_(workspace_ids),
+        models.Workspace.owner_id == current_user.id
+    )))
+
+    # Existing identifiers in the target workspaces
+    external_ids = {p.external_id for p in papers_data if p.external_id}
+    dois = {p.doi for p in papers_data if p.doi}
+    seen_external, seen_doi = set(), set()
+    if owned and (external_ids or dois):
+        existing = (await db.execute(
+            select(models.Paper.workspace_id, models.Paper.external_id, models.Paper.doi).where(
+                models.Paper.workspace_id.in_(owned),
+                or_(models.Paper.external_id.in_(external_ids), models.Paper.doi.in_(dois)),
+            )
+        )).all()
+        seen_external = {(ws_id, ext) for ws_id, ext, _ in existing if ext}
+        seen_doi = {(ws_id, doi) for ws_id, _, doi in existing if doi}
+
+    imported_at = datetime.utcnow()
+    results: List[schemas.BulkImportItemResult] = []
+    new_papers = []
+    for i, paper_data in enumerate(papers_data):
+        ws_id = paper_data.workspace_id
+        if ws_id not in owned:
+            results.append(schemas.BulkImportItemResult(index=i, status="error", detail="Workspace not found"))
+            continue
+        if (paper_data.external_id and (ws_id, paper_data.external_id) in seen_external) or \
+                (paper_data.doi and (ws_id, paper_data.doi) in seen_doi):
+            results.append(schemas.BulkImportItemResult(
+                index=i, status="duplicate", detail="Paper already in workspace"
+            ))
+            continue
+        if paper_data.external_id:
+            seen_external.add((ws_id, paper_data.external_id))
+        if paper_data.doi:
+            seen_doi.add((ws_id, paper_data.doi))
+
+        paper = models.Paper(
+            title=paper_data.title,
+            authors=paper_data.authors,
+            abstract=paper_data.abstract,
+            year=paper_data.year,
+            doi=paper_data.doi,
+            url=paper_data.url,
+            source=paper_data.source or "openalex",
+            external_id=paper_data.external_id,
+            workspace_id=ws_id,
+            # Set client-side so the response can be built without re-selecting each row
+            imported_at=imported_at,
+        )
+        new_papers.append((i, paper))
+        results.append(None)
+
+    if new_papers:
+        await embed_papers_async([p for _, p in new_papers])
+        for attempt in range(BULK_IMPORT_CONFLICT_RETRIES + 1):
+            db.add_all([p for _, p in new_papers])
+            try:
+                await db.flush()
+                break
+            except IntegrityError:
+                # A concurrent import inserted some of these external_ids after the duplicate check:
+                # report those as duplicates and insert the rest (the rolled-back papers are reusable)
+                await db.rollback()
+                if attempt == BULK_IMPORT_CONFLICT_RETRIES:
+                    raise HTTPException(status_code=409, detail="Papers were imported concurrently, retry")
+                taken = set((await db.execute(
+                    select(models.Paper.workspace_id, models.Paper.external_id).where(
+                        models.Paper.workspace_id.in_({p.workspace_id for _, p in new_papers}),
+                        models.Paper.external_id.in_({p.external_id for _, p in new_papers if p.external_id}),
+                    )
+                )).all())
+                for i, paper in new_papers:
+                    if (paper.workspace_id, paper.external_id) in taken:
+                        results[i] = schemas.BulkImportItemResult(
+                            index=i, status="duplicate", detail="Paper already in workspace"
+                        )
+                new_papers = [(i, p) for i, p in new_papers if (p.workspace_id, p.external_id) not in taken]
+                if not new_papers:
+                    break
+
+    if new_papers:
+        for i, paper in new_papers:
+            results[i] = schemas.BulkImportItemResult(
+                index=i, status="created", paper=schemas.PaperOut.model_validate(paper)
+            )
+        # Collect everything needed after the commit now, while the rows are loaded
+        touched_workspaces = {p.workspace_id for _, p in new_papers}
+        vectors_by_workspace, unembedded = {}, set()
+        for _, paper in new_papers:
+            if paper.embedding is not None:
+                vectors_by_workspace.setdefault(paper.workspace_id, []).append(
+                    (paper.id, load_embedding(paper))
+                )
+            else:
+                unembedded.add(paper.workspace_id)
+        versions = dict((await db.execute(bump_paper_version(touched_workspaces))).all())
+        await db.commit()
+
+        for ws_id, rows in vectors_by_workspace.items():
+            # A workspace with papers missing from the store stays behind its version, so it is rebuilt
+            version = None if ws_id in unembedded else versions[ws_id]
+            await run_in_threadpool(
+                vector_indexes.add_papers, ws_id, [pid for pid, _ in rows], np.vstack([v for _, v in rows]), version
+            )
+        for ws_id in touched_workspaces:
+            answer_cache.invalidate(ws_id)
+
+    return schemas.BulkImportResponse(
+        created=len(new_papers),
+        duplicates=sum(1 for r in results if r.status == "duplicate"),
+        errors=sum(1 for r in results if r.status == "error"),
+        results=results,
+    )
+
+
+@router.get("/workspace/{workspace_id}", response_model=Union[schemas.PaperPage, schemas.PaperSummaryPage])
+async def list_workspace_papers(
+    workspace_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: Literal["imported_at", "year"] = "imported_at",
+    order: Literal["desc", "asc"] = "desc",
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    source: Optional[str] = None,
+    fields: Literal["full", "summary"] = Query("full", description="'summary' omits abstracts and links"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Keyset-paginated papers of a workspace, sorted by import time (newest first
+    by default) or publication year, optionally filtered by year range and source.
+    """
+    workspace = await db.scalar(select(models.Workspace.id).where(
+        models.Workspace.id == workspace_id,
+        models.Workspace.owner_id == current_user.id
+    ))
+    if not workspace:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+
+    Paper = models.Paper
+    if fields == "summary":
+        # Only these columns are selected; abstracts never leave the database
+        query = select(Paper.id, Paper.title, Paper.authors, Paper.year)
+    else:
+        query = select(Paper).options(defer(Paper.embedding))
+    query = query.where(Paper.workspace_id == workspace_id)
+    if year_from is not None:
+        query = query.where(Paper.year >= year_from)
+    if year_to is not None:
+        query = query.where(Paper.year <= year_to)
+    if source:
+        query = query.where(Paper.source == source)
+
+    descending = order == "desc"
+    if sort == "imported_at":
+        # Papers are append-only, so id order is import order
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.where(Paper.id < last_id if descending else Paper.id > last_id)
+        query = query.order_by(Paper.id.desc() if descending else Paper.id.asc())
+    else:
+        if cursor:
+            last_year, last_id = decode_cursor(cursor, (int, None), int)
+            id_after = Paper.id < last_id if descending else Paper.id > last_id
+            if last_year is None:
+                # Already in the trailing block of papers without a year
+                query = query.where(Paper.year.is_(None), id_after)
+            else:
+                year_after = Paper.year < last_year if descending else Paper.year > last_year
+                query = query.where(or_(
+                    year_after,
+                    and_(Paper.year == last_year, id_after),
+                    Paper.year.is_(None),
+                ))
+        year_order = Paper.year.desc() if descending else Paper.year.asc()
+        query = query.order_by(nullslast(year_order), Paper.id.desc() if descending else Paper.id.asc())
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all() if fields == "summary" else result.scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.id) if sort == "imported_at" else encode_cursor(last.year, last.id)
+
+    if fields == "summary":
+        return schemas.PaperSummaryPage(
+            items=[schemas.PaperSummary.model_validate(r) for r in rows], next_cursor=next_cursor
+        )
+    return schemas.PaperPage(items=[schemas.PaperOut.model_validate(r) for r in rows], next_cursor=next_cursor)
+
+
+@router.get("/workspace/{workspace_id}/search", response_model=List[schemas.PaperSearchHit])
+async def search_workspace_papers(
     workspace_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    q: str = Query(..., min_length=1, description="Search terms; the last term also matches as a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = Query(True, description="Treat the last term as a prefix (search-as-you-type)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    workspace = db.query(models.Workspace).filter(
+    """Full-text search over the workspace's papers (title, authors, abstract), ranked by BM25."""
+    workspace = await db.scalar(select(models.Workspace.id).where(
         models.Workspace.id == workspace_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
+    ))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
-    return workspace.papers
+    return await search_library(db, workspace_id, q, limit=limit, prefix=prefix)
 
 
 @router.delete("/{paper_id}", status_code=204)
-def delete_paper(
+async def delete_paper(
     paper_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    paper = db.query(models.Paper).join(models.Workspace).filter(
+    paper = await db.scalar(select(models.Paper).join(models.Workspace).where(
         models.Paper.id == paper_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
+    ))
     if not paper:
         raise HTTPException(status_code=404, detail="Paper not found")
-    db.delete(paper)
-    db.commit()
+    workspace_id = paper.workspace_id
+    await db.delete(paper)
+    version = (await db.execute(bump_paper_version([workspace_id]))).one().paper_version
+    await db.commit()
+    await run_in_threadpool(vector_indexes.remove_paper, workspace_id, paper_id, version)
+    answer_cache.invalidate(workspace_id)
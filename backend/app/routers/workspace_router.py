@@ -1,41 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List
 
 from ..database import get_db
 from .. import models, schemas
-from ..auth import get_current_user
+from ..auth import UserPrincipal, get_current_user
+from ..utils.answer_cache import answer_cache
+from ..utils.vector_index import vector_indexes
 
 router = APIRouter(prefix="/workspaces", tags=["Workspaces"])
 
 
+def _paper_count():
+    """Correlated COUNT of a workspace's papers (an index seek per workspace, no ORM loads)."""
+    return (
+        select(func.count(models.Paper.id))
+        .where(models.Paper.workspace_id == models.Workspace.id)
+        .correlate(models.Workspace)
+        .scalar_subquery()
+        .label("paper_count")
+    )
+
+
+def _workspace_out(ws: models.Workspace, paper_count: int) -> schemas.WorkspaceOut:
+    return schemas.WorkspaceOut(
+        id=ws.id,
+        name=ws.name,
+        description=ws.description or "",
+        created_at=ws.created_at,
+        owner_id=ws.owner_id,
+        paper_count=paper_count
+    )
+
+
 @router.get("/", response_model=List[schemas.WorkspaceOut])
-def list_workspaces(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def list_workspaces(
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    workspaces = db.query(models.Workspace).filter(
-        models.Workspace.owner_id == current_user.id
-    ).all()
-    result = []
-    for ws in workspaces:
-        ws_out = schemas.WorkspaceOut(
-            id=ws.id,
-            name=ws.name,
-            description=ws.description or "",
-            created_at=ws.created_at,
-            owner_id=ws.owner_id,
-            paper_count=len(ws.papers)
-        )
-        result.append(ws_out)
-    return result
+    rows = (await db.execute(
+        select(models.Workspace, _paper_count()).where(models.Workspace.owner_id == current_user.id)
+    )).all()
+    return [_workspace_out(ws, paper_count) for ws, paper_count in rows]
 
 
 @router.post("/", response_model=schemas.WorkspaceOut, status_code=status.HTTP_201_CREATED)
-def create_workspace(
+async def create_workspace(
     workspace_data: schemas.WorkspaceCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     workspace = models.Workspace(
         name=workspace_data.name,
@@ -43,51 +58,39 @@ def create_workspace(
         owner_id=current_user.id
     )
     db.add(workspace)
-    db.commit()
-    db.refresh(workspace)
-    return schemas.WorkspaceOut(
-        id=workspace.id,
-        name=workspace.name,
-        description=workspace.description or "",
-        created_at=workspace.created_at,
-        owner_id=workspace.owner_id,
-        paper_count=0
-    )
+    await db.commit()
+    await db.refresh(workspace)
+    return _workspace_out(workspace, 0)
 
 
 @router.get("/{workspace_id}", response_model=schemas.WorkspaceOut)
-def get_workspace(
+async def get_workspace(
     workspace_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    workspace = db.query(models.Workspace).filter(
+    row = (await db.execute(select(models.Workspace, _paper_count()).where(
         models.Workspace.id == workspace_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
-    if not workspace:
+    ))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Workspace not found")
-    return schemas.WorkspaceOut(
-        id=workspace.id,
-        name=workspace.name,
-        description=workspace.description or "",
-        created_at=workspace.created_at,
-        owner_id=workspace.owner_id,
-        paper_count=len(workspace.papers)
-    )
+    return _workspace_out(*row)
 
 
 @router.delete("/{workspace_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_workspace(
+async def delete_workspace(
     workspace_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    workspace = db.query(models.Workspace).filter(
+    workspace = await db.scalar(select(models.Workspace).where(
         models.Workspace.id == workspace_id,
         models.Workspace.owner_id == current_user.id
-    ).first()
+    ))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
-    db.delete(workspace)
-    db.commit()
+    await db.delete(workspace)
+    await db.commit()
+    await run_in_threadpool(vector_indexes.drop, workspace_id)
+    answer_cache.invalidate(workspace_id)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, field_validator
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 
@@ -63,6 +63,12 @@ class PaperImport(BaseModel):
     source: Optional[str] = "openalex"
     external_id: Optional[str] = None
 
+    @field_validator("external_id")
+    @classmethod
+    def blank_external_id_is_none(cls, value: Optional[str]) -> Optional[str]:
+        # "" would collide with itself in the per-workspace unique index; NULLs don't
+        return value if value and value.strip() else None
+
 
 class PaperOut(BaseModel):
     id: int
@@ -80,6 +86,51 @@ class PaperOut(BaseModel):
         from_attributes = True
 
 
+class PaperSummary(BaseModel):
+    """Lightweight projection of a paper (no abstract) for large listings."""
+    id: int
+    title: str
+    authors: str
+    year: Optional[int]
+
+    class Config:
+        from_attributes = True
+
+
+class PaperPage(BaseModel):
+    items: List[PaperOut]
+    next_cursor: Optional[str] = None     # pass back as ?cursor= for the next page
+
+
+class PaperSummaryPage(BaseModel):
+    items: List[PaperSummary]
+    next_cursor: Optional[str] = None
+
+
+class PaperSearchHit(BaseModel):
+    id: int
+    title: str
+    authors: str
+    year: Optional[int]
+    source: str
+    score: Optional[float] = None       # BM25 relevance, higher is better
+    snippet: Optional[str] = None       # HTML-escaped excerpt with matches in <mark>
+
+
+class BulkImportItemResult(BaseModel):
+    index: int                          # position in the request list
+    status: str                         # created | duplicate | error
+    paper: Optional[PaperOut] = None
+    detail: Optional[str] = None
+
+
+class BulkImportResponse(BaseModel):
+    created: int
+    duplicates: int
+    errors: int
+    results: List[BulkImportItemResult]
+
+
 # ─── Search Results (not DB) ─────────────────────────────────────────────────
 
 class SearchResult(BaseModel):
@@ -99,6 +150,9 @@ class ChatRequest(BaseModel):
     workspace_id: int
     message: str
     conversation_id: Optional[int] = None
+    # Paper retrieval for the prompt; None uses the server defaults (CHAT_RETRIEVAL_MODE / _RERANK)
+    retrieval: Optional[Literal["dense", "lexical", "hybrid"]] = None
+    rerank: Optional[bool] = None
 
 
 class MessageOut(BaseModel):
@@ -112,17 +166,28 @@ class MessageOut(BaseModel):
         from_attributes = True
 
 
-class ConversationOut(BaseModel):
+class ConversationSummary(BaseModel):
     id: int
     title: str
     created_at: datetime
     workspace_id: int
-    messages: List[MessageOut] = []
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_message_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+
+class ConversationPage(BaseModel):
+    items: List[ConversationSummary]
+    next_cursor: Optional[str] = None     # pass back as ?cursor= for older conversations
+
+
+class MessagePage(BaseModel):
+    items: List[MessageOut]               # oldest first within the page
+    next_cursor: Optional[str] = None     # pass back as ?cursor= for older messages
 
 
 class ChatResponse(BaseModel):
     conversation_id: int
     reply: str
+    timings_ms: Dict[str, float] = {}     # per-stage latency of this turn (encode, dense, lexical, ...)
+    prompt_tokens: Optional[int] = None   # size of the packed prompt (None for a cached answer)
@@ -0,0 +1,126 @@
+"""
+Semantic Answer Cache
+Returns stored LLM answers for repeated or near-duplicate questions asked
+against the same workspace, skipping retrieval and the Groq call.
+
+Entries are keyed by workspace and retrieval settings (mode, rerank), tagged
+with the workspace's paper-set version (so importing or deleting a paper
+invalidates them), and matched either exactly on the normalized question or
+by cosine similarity of the question embedding.
+Only opening questions of a conversation are cached, since later answers
+depend on the conversation history.
+"""
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+import time
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+
+def normalize_question(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+class _Entry:
+    __slots__ = ("version", "embedding", "answer", "expires_at")
+
+    def __init__(self, version, embedding: np.ndarray, answer: str, expires_at: float):
+        self.version = version
+        self.embedding = embedding
+        self.answer = answer
+        self.expires_at = expires_at
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.enabled = enabled
+        # (workspace_id, retrieval settings, normalized question) -> entry, in LRU order
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def lookup(
+        self, workspace_id: int, version: int, settings: tuple, message: str, embedding: Optional[np.ndarray]
+    ) -> Optional[str]:
+        """Return a cached answer for this question, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        key = (workspace_id, settings, normalize_question(message))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.answer
+
+            best_key, best_score = None, self.threshold
+            if embedding is not None:
+                for other_key, other in list(self._entries.items()):
+                    if other_key[:2] != (workspace_id, settings):
+                        continue
+                    # Versions only grow: an older one is stale for good, a newer one was stored by a
+                    # request that saw a later import than ours and stays for the next lookups
+                    if other.version < version or other.expires_at <= now:
+                        del self._entries[other_key]
+                        continue
+                    if other.version != version:
+                        continue
+                    score = float(other.embedding @ embedding)
+                    if score >= best_score:
+                        best_key, best_score = other_key, score
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                return self._entries[best_key].answer
+
+            self.misses += 1
+            return None
+
+    def store(self, workspace_id: int, version: int, settings: tuple, message: str, embedding: np.ndarray, answer: str):
+        if not self.enabled or embedding is None:
+            return
+        key = (workspace_id, settings, normalize_question(message))
+        with self._lock:
+            self._entries[key] = _Entry(version, embedding, answer, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, workspace_id: int):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == workspace_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,266 @@
+"""
+Chat Prompt Budget
+Packs a chat turn's prompt into a fixed token budget, by priority: the system
+instructions and the user's message, then the most recent turns (up to the
+history budget), then as many ranked paper passages as still fit. Long
+abstracts are cut to a per-passage cap, and the last passage to the space left.
+
+Turns that no longer fit are folded into a rolling summary stored on the
+Conversation, updated after the reply is sent, so prompt size (and so input
+token cost and LLM latency) stays flat however long a conversation grows.
+
+Tokens are counted with tiktoken when its encoding can be loaded, otherwise
+estimated from the character count; both err on the side of overcounting for
+Llama's tokenizer.
+"""
+from typing import List, Optional
+import math
+import os
+import time
+
+from sqlalchemy import select, update
+
+from .. import models
+from ..database import open_session
+from .llm import LLM_MODEL
+from .metrics import record_llm_call
+from .research_assistant import build_system_prompt, paper_passage
+from .structured_logging import get_logger
+
+logger = get_logger("chat_context")
+
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "6000"))
+# Cap on verbatim recent turns; older ones are represented by the summary
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+CHAT_PASSAGE_MAX_TOKENS = int(os.getenv("CHAT_PASSAGE_MAX_TOKENS", "400"))
+# Most recent unsummarized messages loaded per turn (the token budget decides how many are used)
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "40"))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", LLM_MODEL)
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+# Transcript tokens per summarization call, and calls per turn (catching up long old conversations)
+CHAT_SUMMARY_INPUT_TOKENS = int(os.getenv("CHAT_SUMMARY_INPUT_TOKENS", "3000"))
+CHAT_SUMMARY_MAX_CALLS = int(os.getenv("CHAT_SUMMARY_MAX_CALLS", "4"))
+# tiktoken encoding used for counting; empty uses the character estimate only
+CHAT_TOKENIZER = os.getenv("CHAT_TOKENIZER", "cl100k_base")
+
+# Estimate when no tokenizer is available; English prose averages ~4 characters per token
+CHARS_PER_TOKEN = 3.5
+# Role and separator tokens the chat template adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Don't bother adding a passage cut shorter than this
+MIN_PASSAGE_TOKENS = 48
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a researcher and a research assistant. "
+    "Merge the new messages into the current summary. Keep the questions asked, papers and findings "
+    "discussed, conclusions reached and open follow-ups; drop pleasantries. "
+    "Reply with the updated summary only, in at most {max_words} words."
+)
+
+_encoding = None
+_encoding_loaded = False
+
+
+def load_tokenizer():
+    """Load the tiktoken encoding once (may download it; call from startup, not a request)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if CHAT_TOKENIZER:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(CHAT_TOKENIZER)
+            except Exception as e:
+                logger.warning("Could not load tokenizer, estimating token counts: %s", e)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """text cut to at most max_tokens, with an ellipsis if anything was dropped."""
+    if max_tokens <= 0:
+        return ""
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return _encoding.decode(tokens[:max_tokens - 1]).rstrip() + "…"
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def message_tokens(content: str) -> int:
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PackedPrompt:
+    """Messages for the LLM call plus what was packed into them."""
+
+    def __init__(self, messages: list, prompt_tokens: int, papers: int, history_messages: int):
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.papers = papers
+        self.history_messages = history_messages
+
+
+def pack_prompt(
+    papers: list,
+    history: List[dict],
+    message: str,
+    summary: Optional[str] = None,
+    budget: int = CHAT_PROMPT_TOKEN_BUDGET,
+    history_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+) -> PackedPrompt:
+    """
+    Fit the prompt for a turn into `budget` tokens. papers are in rank order
+    and history oldest first; both are trimmed, the system instructions,
+    summary and current message never are.
+    """
+    # The template with an empty context section: everything but the passages
+    fixed = message_tokens(build_system_prompt([""], summary)) + message_tokens(message)
+    remaining = budget - fixed
+
+    # Most recent turns first, stopping at the first that doesn't fit so the kept turns stay contiguous
+    history_left = min(history_budget, remaining)
+    kept = 0
+    for turn in reversed(history):
+        cost = message_tokens(turn["content"])
+        if cost > history_left:
+            break
+        history_left -= cost
+        remaining -= cost
+        kept += 1
+    recent = history[len(history) - kept:]
+
+    passages = []
+    for paper in papers:
+        abstract = truncate_tokens(paper.abstract or "No abstract available.", CHAT_PASSAGE_MAX_TOKENS)
+        passage = paper_passage(len(passages) + 1, paper, abstract)
+        # +1 for the blank line between passages
+        cost = count_tokens(passage) + 1
+        if cost > remaining:
+            header_cost = count_tokens(paper_passage(len(passages) + 1, paper, "")) + 1
+            if remaining - header_cost >= MIN_PASSAGE_TOKENS:
+                passage = paper_passage(len(passages) + 1, paper, truncate_tokens(abstract, remaining - header_cost))
+                passages.append(passage)
+                remaining -= count_tokens(passage) + 1
+            break
+        passages.append(passage)
+        remaining -= cost
+
+    messages = [{"role": "system", "content": build_system_prompt(passages, summary)}]
+    messages.extend(recent)
+    messages.append({"role": "user", "content": message})
+    prompt_tokens = sum(message_tokens(m["content"]) for m in messages)
+    return PackedPrompt(messages, prompt_tokens, len(passages), kept)
+
+
+async def load_history(db, conversation) -> List[dict]:
+    """The most recent messages not yet covered by the conversation's summary, oldest first."""
+    query = select(models.Message.role, models.Message.content).where(
+        models.Message.conversation_id == conversation.id
+    )
+    if conversation.summary_message_id is not None:
+        query = query.where(models.Message.id > conversation.summary_message_id)
+    rows = (await db.execute(query.order_by(
+        models.Message.created_at.desc(), models.Message.id.desc()
+    ).limit(CHAT_HISTORY_MAX_MESSAGES))).all()
+    return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+
+def _transcript(rows) -> str:
+    return "\n\n".join(
+        f"{role.capitalize()}: {truncate_tokens(content, CHAT_SUMMARY_INPUT_TOKENS // 2)}"
+        for _, role, content in rows
+    )
+
+
+async def _summarize(client, summary: Optional[str], rows) -> str:
+    started = time.perf_counter()
+    try:
+        completion = await client.chat.completions.create(
+            model=CHAT_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_words=CHAT_SUMMARY_MAX_TOKENS * 3 // 4)},
+                {"role": "user", "content": f"Current summary:\n{summary or '(none yet)'}\n\nNew messages:\n{_transcript(rows)}"},
+            ],
+            temperature=0.0,
+            max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+        )
+    except Exception:
+        record_llm_call("summary", time.perf_counter() - started, "error")
+        raise
+    usage = getattr(completion, "usage", None)
+    record_llm_call(
+        "summary", time.perf_counter() - started,
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        completion_tokens=usage.completion_tokens if usage else 0,
+    )
+    return completion.choices[0].message.content.strip()
+
+
+async def update_summary(conversation_id: int, client) -> int:
+    """
+    Fold the oldest unsummarized turns of a conversation into its summary once
+    they overflow the history budget, keeping the newest half-budget of turns
+    verbatim (so this runs every few turns, not every turn). Meant to run
+    after the reply is sent; returns the number of messages folded.
+    """
+    folded = 0
+    try:
+        async with open_session() as db:
+            conversation = await db.get(models.Conversation, conversation_id)
+            if conversation is None:
+                return 0
+            summary, summary_message_id = conversation.summary, conversation.summary_message_id
+            query = select(models.Message.id, models.Message.role, models.Message.content).where(
+                models.Message.conversation_id == conversation_id
+            )
+            if summary_message_id is not None:
+                query = query.where(models.Message.id > summary_message_id)
+            rows = (await db.execute(query.order_by(models.Message.id))).all()
+
+            costs = [message_tokens(content) for _, _, content in rows]
+            if sum(costs) <= CHAT_HISTORY_TOKEN_BUDGET:
+                return 0
+            keep, kept_tokens = len(rows), 0
+            while keep > 0 and kept_tokens + costs[keep - 1] <= CHAT_HISTORY_TOKEN_BUDGET // 2:
+                keep -= 1
+                kept_tokens += costs[keep]
+
+            start = 0
+            for _ in range(CHAT_SUMMARY_MAX_CALLS):
+                if start >= keep:
+                    break
+                end, chunk_tokens = start, 0
+                while end < keep and (end == start or chunk_tokens + costs[end] <= CHAT_SUMMARY_INPUT_TOKENS):
+                    chunk_tokens += costs[end]
+                    end += 1
+                new_summary = await _summarize(client, summary, rows[start:end])
+                new_message_id = rows[end - 1][0]
+                # Compare-and-set: a concurrent turn may have folded the same messages already
+                result = await db.execute(
+                    update(models.Conversation)
+                    .where(
+                        models.Conversation.id == conversation_id,
+                        models.Conversation.summary_message_id.is_(None) if summary_message_id is None
+                        else models.Conversation.summary_message_id == summary_message_id,
+                    )
+                    .values(summary=new_summary, summary_message_id=new_message_id)
+                )
+                await db.commit()
+                if result.rowcount != 1:
+                    break
+                summary, summary_message_id = new_summary, new_message_id
+                folded += end - start
+                start = end
+    except Exception as e:
+        logger.warning("Could not update conversation summary: %s", e, extra={"fields": {"conversation_id": conversation_id}})
+    return folded
@@ -0,0 +1,225 @@
+"""
+Embedding Service
+Runs all request-path embedding through one queue and one dedicated inference
+thread. Concurrent encode requests (chat queries, paper imports) are coalesced
+into micro-batches of up to EMBEDDING_MAX_BATCH texts, collected for at most
+EMBEDDING_MAX_WAIT_MS after the first one arrives, so N simultaneous chat
+turns cost one forward pass instead of N batch-of-one passes.
+
+Chat queries are queued ahead of import texts, so a bulk import never delays
+a chat turn by more than the batch in flight. Import texts are admitted while
+fewer than EMBEDDING_QUEUE_MAX are queued, chat queries have one more batch of
+headroom on top; producers wait for room for up to
+EMBEDDING_QUEUE_TIMEOUT_SECONDS and then get a 503 with Retry-After.
+
+Created and shut down in the FastAPI lifespan.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import asyncio
+import itertools
+import os
+import time
+
+import numpy as np
+from fastapi import HTTPException
+
+from .research_assistant import (
+    EMBEDDING_BATCH_SIZE,
+    embedding_is_stale,
+    encode_texts,
+    paper_text,
+    store_embeddings,
+)
+
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", str(EMBEDDING_BATCH_SIZE)))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+EMBEDDING_QUEUE_MAX = int(os.getenv("EMBEDDING_QUEUE_MAX", "1024"))
+EMBEDDING_QUEUE_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Queue priorities: lower is served first
+PRIORITY_QUERY = 0
+PRIORITY_IMPORT = 1
+
+
+class EmbeddingService:
+    def __init__(
+        self,
+        max_batch: int = EMBEDDING_MAX_BATCH,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        queue_max: int = EMBEDDING_QUEUE_MAX,
+        queue_timeout: float = EMBEDDING_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        # (priority, sequence, text, future, enqueued_at); the sequence keeps FIFO order within a priority.
+        # Unbounded: admission is limited in _submit, per priority
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._dequeued = asyncio.Event()
+        self._sequence = itertools.count()
+        # One thread: batches run back to back. Index rebuilds also encode, off this thread,
+        # so encode_texts serializes access to the model
+        self._thread = ThreadPoolExecutor(1, thread_name_prefix="embedding")
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        self.batches = 0
+        self.texts = 0
+        self.rejected = 0
+        self.max_batch_seen = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.encode_time_total = 0.0
+
+    async def _submit(self, text: str, priority: int) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        limit = self.queue_max + (self.max_batch if priority == PRIORITY_QUERY else 0)
+        deadline = loop.time() + self.queue_timeout
+        while self._queue.qsize() >= limit:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Embedding service is busy, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._dequeued.clear()
+            try:
+                await asyncio.wait_for(self._dequeued.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        future = loop.create_future()
+        self._queue.put_nowait((priority, next(self._sequence), text, future, time.perf_counter()))
+        return future
+
+    async def encode(self, text: str) -> Optional[np.ndarray]:
+        """Embedding of a chat query; None if no embedding model is available."""
+        return await (await self._submit(text, PRIORITY_QUERY))
+
+    async def encode_many(self, texts: List[str], priority: int = PRIORITY_IMPORT) -> Optional[np.ndarray]:
+        """(n, dim) embeddings of texts, in order; None if no embedding model is available."""
+        futures = []
+        try:
+            for text in texts:
+                futures.append(await self._submit(text, priority))
+            vectors = await asyncio.gather(*futures)
+        except BaseException:
+            # Rejected or cancelled: don't leave the rest of the texts to be encoded for nobody
+            for future in futures:
+                future.cancel()
+            raise
+        if not vectors or any(v is None for v in vectors):
+            return None
+        return np.vstack(vectors)
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        # Give concurrent requests a moment to join, unless a full batch is already waiting
+        if self.max_wait > 0 and self._queue.qsize() < self.max_batch - 1:
+            await asyncio.sleep(self.max_wait)
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        self._dequeued.set()
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Requests that were cancelled while queued are dropped
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                vectors = await loop.run_in_executor(self._thread, encode_texts, [item[2] for item in batch], len(batch))
+            except Exception as e:
+                for item in batch:
+                    if not item[3].done():
+                        item[3].set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            self.batches += 1
+            self.texts += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.encode_time_total += finished - started
+            for i, (_, _, _, future, enqueued_at) in enumerate(batch):
+                wait = started - enqueued_at
+                self.queue_wait_total += wait
+                self.queue_wait_max = max(self.queue_wait_max, wait)
+                if not future.done():
+                    future.set_result(None if vectors is None else vectors[i])
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self.queue_max,
+            "max_batch": self.max_batch,
+            "max_wait_ms": 1000 * self.max_wait,
+            "batches": self.batches,
+            "texts": self.texts,
+            "rejected": self.rejected,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_queue_wait_ms": 1000 * self.queue_wait_total / self.texts if self.texts else 0.0,
+            "max_queue_wait_ms": 1000 * self.queue_wait_max,
+            "avg_batch_encode_ms": 1000 * self.encode_time_total / self.batches if self.batches else 0.0,
+        }
+
+    async def shutdown(self):
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            self._queue.get_nowait()[3].cancel()
+        self._thread.shutdown(wait=False, cancel_futures=True)
+
+
+_service: Optional[EmbeddingService] = None
+
+
+def create_embedding_service() -> EmbeddingService:
+    """Create the shared embedding queue and worker (called from the FastAPI lifespan)."""
+    global _service
+    if _service is None:
+        _service = EmbeddingService()
+    return _service
+
+
+async def close_embedding_service():
+    global _service
+    if _service is not None:
+        await _service.shutdown()
+        _service = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """The shared embedding service (created on first use outside the lifespan, e.g. in scripts)."""
+    return _service or create_embedding_service()
+
+
+async def encode_query_async(query: str) -> Optional[np.ndarray]:
+    """L2-normalized float32 query embedding; None if the model is unavailable."""
+    return await get_embedding_service().encode(query)
+
+
+async def embed_papers_async(papers: list) -> int:
+    """
+    Async embed_papers: encodes every stale paper through the service and
+    stores the vectors. Returns the number of papers modified (caller commits).
+    """
+    stale = [p for p in papers if embedding_is_stale(p)]
+    if not stale:
+        return 0
+    vectors = await get_embedding_service().encode_many([paper_text(p) for p in stale])
+    if vectors is None:
+        return 0
+    store_embeddings(stale, vectors)
+    return len(stale)
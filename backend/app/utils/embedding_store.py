@@ -0,0 +1,237 @@
+"""
+Embedding Store
+Compact on-disk storage of paper embeddings, one pair of files per workspace:
+
+    ws_<id>.<gen>.ids   int64 paper ids (-1 marks a deleted row / tombstone)
+    ws_<id>.<gen>.vec   float16 matrix, one L2-normalized row per id
+    ws_<id>.json        metadata (dimension, dtype, embedding model, current generation,
+                        workspace paper_version the rows reflect)
+
+Readers map the files with numpy.memmap, so every uvicorn worker shares the
+same pages through the OS page cache instead of holding a private copy.
+Writers append new rows, tombstone deleted ones in place and periodically
+compact the files; all writes are serialized across processes with a file lock.
+
+The stored version only advances by one per change (the version an import or
+delete committed, applied on top of the one before it). A change that never
+reached the store, or arrived out of order, leaves it behind the database, so
+readers rebuild it instead of serving a stale paper set.
+"""
+from contextlib import contextmanager
+from typing import Optional, Tuple
+import json
+import os
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, no cross-process lock needed
+    fcntl = None
+
+STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "./embeddings")
+STORE_DTYPE = np.float16
+# Compact once this fraction of rows are tombstones
+COMPACT_RATIO = float(os.getenv("EMBEDDING_STORE_COMPACT_RATIO", "0.25"))
+
+TOMBSTONE = -1
+
+
+class WorkspaceEmbeddingStore:
+    def __init__(self, workspace_id: int, model_name: str, root: str = STORE_DIR):
+        self.workspace_id = workspace_id
+        self.model_name = model_name
+        self.root = root
+        self.base = os.path.join(root, f"ws_{workspace_id}")
+        self.meta_path = self.base + ".json"
+        self.lock_path = self.base + ".lock"
+
+    def _paths(self, generation: int) -> Tuple[str, str]:
+        return f"{self.base}.{generation}.ids", f"{self.base}.{generation}.vec"
+
+    # ─── Locking & metadata ──────────────────────────────────────────────────
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_raw_meta(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_meta(self) -> Optional[dict]:
+        """Metadata of the current generation, or None if missing or built for another model."""
+        meta = self._read_raw_meta()
+        if meta is None or meta.get("model") != self.model_name or meta.get("dtype") != np.dtype(STORE_DTYPE).name:
+            return None
+        return meta
+
+    def read_version(self) -> Optional[int]:
+        """Workspace paper_version the rows reflect (None if not built or unknown)."""
+        meta = self._read_meta()
+        return meta.get("version") if meta else None
+
+    @staticmethod
+    def _next_version(meta: dict, version: Optional[int]) -> Optional[int]:
+        current = meta.get("version")
+        if version is not None and current is not None and version == current + 1:
+            return version
+        return current
+
+    def _write_meta(self, meta: dict):
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, self.meta_path)
+
+    def _row_count(self, ids_path: str) -> int:
+        try:
+            return os.path.getsize(ids_path) // np.dtype(np.int64).itemsize
+        except OSError:
+            return 0
+
+    # ─── Reads ───────────────────────────────────────────────────────────────
+
+    def open_view(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Read-only memory maps of (ids, vectors), or None if the store is missing
+        or was written for another model. Rows with id == TOMBSTONE are deleted.
+        """
+        # A compaction may retire the generation between reading meta and mapping it
+        for _ in range(2):
+            meta = self._read_meta()
+            if meta is None:
+                return None
+            ids_path, vec_path = self._paths(meta["generation"])
+            n = self._row_count(ids_path)
+            dim = meta["dim"]
+            if n == 0:
+                return np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=STORE_DTYPE)
+            try:
+                # ids are written after vectors, so the vector file always has >= n rows
+                ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(n,))
+                vecs = np.memmap(vec_path, dtype=STORE_DTYPE, mode="r", shape=(n, dim))
+            except FileNotFoundError:
+                continue
+            return ids, vecs
+        return None
+
+    # ─── Writes ──────────────────────────────────────────────────────────────
+
+    def _write_all(self, ids: np.ndarray, vectors: np.ndarray, version: Optional[int]):
+        """Write a new generation and switch readers to it by atomically replacing meta."""
+        previous = self._read_raw_meta()
+        generation = previous["generation"] + 1 if previous else 1
+        ids_path, vec_path = self._paths(generation)
+        dim = vectors.shape[1] if vectors.ndim == 2 and vectors.size else 0
+        np.asarray(vectors, dtype=STORE_DTYPE).tofile(vec_path)
+        np.asarray(ids, dtype=np.int64).tofile(ids_path)
+        self._write_meta({
+            "dim": dim,
+            "dtype": np.dtype(STORE_DTYPE).name,
+            "model": self.model_name,
+            "generation": generation,
+            "version": version,
+        })
+        # Existing memory maps keep the old inodes, so readers are never torn
+        if previous:
+            self._remove_generation(previous["generation"])
+
+    def _remove_generation(self, generation: int):
+        for path in self._paths(generation):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def rewrite(self, ids: np.ndarray, vectors: np.ndarray, version: Optional[int]):
+        """Replace the whole store with the given rows, read at workspace paper_version `version`."""
+        with self._locked():
+            self._write_all(ids, vectors, version)
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray, version: Optional[int] = None):
+        """
+        Append rows to an existing store (no-op if the store has not been built).
+        version: the paper_version the import committed; None leaves the store behind.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=STORE_DTYPE))
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        with self._locked():
+            meta = self._read_meta()
+            if meta is None:
+                return  # no store yet; it is built from the database on next use
+            ids_path, vec_path = self._paths(meta["generation"])
+            n = self._row_count(ids_path)
+            if n == 0 or meta["dim"] != vectors.shape[1]:
+                self._write_all(ids, vectors, self._next_version(meta, version))
+                return
+            # Drop vector rows left behind by an append interrupted before its ids were written
+            os.truncate(vec_path, n * meta["dim"] * np.dtype(STORE_DTYPE).itemsize)
+            with open(vec_path, "ab") as f:
+                vectors.tofile(f)
+            with open(ids_path, "ab") as f:
+                ids.tofile(f)
+            next_version = self._next_version(meta, version)
+            if next_version != meta.get("version"):
+                self._write_meta({**meta, "version": next_version})
+
+    def tombstone(self, paper_id: int, version: Optional[int] = None):
+        """
+        Mark a paper's row as deleted, compacting once enough rows are dead.
+        version: the paper_version the delete committed; None leaves the store behind.
+        """
+        with self._locked():
+            meta = self._read_meta()
+            if meta is None:
+                return
+            next_version = self._next_version(meta, version)
+            ids_path, _ = self._paths(meta["generation"])
+            n = self._row_count(ids_path)
+            if n:
+                ids = np.memmap(ids_path, dtype=np.int64, mode="r+", shape=(n,))
+                rows = np.flatnonzero(ids == paper_id)
+                if len(rows):
+                    ids[rows] = TOMBSTONE
+                    ids.flush()
+                dead = int((ids == TOMBSTONE).sum())
+                del ids
+                if dead and dead >= COMPACT_RATIO * n:
+                    self._compact(next_version)
+                    return
+            # After the row is gone, so a reader never sees the new version with the deleted paper
+            if next_version != meta.get("version"):
+                self._write_meta({**meta, "version": next_version})
+
+    def _compact(self, version: Optional[int]):
+        view = self.open_view()
+        if view is None:
+            return
+        ids, vecs = view
+        live = ids != TOMBSTONE
+        self._write_all(np.array(ids[live]), np.array(vecs[live]), version)
+
+    def compact(self):
+        """Drop tombstoned rows by rewriting the files."""
+        with self._locked():
+            self._compact(self.read_version())
+
+    def destroy(self):
+        with self._locked():
+            meta = self._read_raw_meta()
+            if meta is not None:
+                self._remove_generation(meta["generation"])
+            try:
+                os.remove(self.meta_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,138 @@
+"""
+Outbound HTTP Client
+Application-scoped httpx.AsyncClient for calls to external APIs (OpenAlex and
+future paper sources). Connections are pooled and kept alive across requests,
+HTTP/2 is used when the `h2` package is installed, and 429/5xx responses are
+retried with exponential backoff (honouring Retry-After, within a bounded
+retry budget so an upstream asking for an hour's pause never holds a request).
+
+Created and closed in the FastAPI lifespan; routers receive it through the
+get_http_client dependency.
+"""
+from typing import Optional
+import asyncio
+import os
+import random
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "15"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))
+# Longest single wait between attempts, and total waiting allowed across all retries of a request
+HTTP_MAX_BACKOFF_SECONDS = float(os.getenv("HTTP_MAX_BACKOFF_SECONDS", "10"))
+HTTP_RETRY_BUDGET_SECONDS = float(os.getenv("HTTP_RETRY_BUDGET_SECONDS", "20"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class OutboundHTTPClient:
+    def __init__(self):
+        self.http2 = _http2_available()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=5.0),
+            http2=self.http2,
+            headers={"User-Agent": "ResearchHub-AI/1.0"},
+        )
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response], budget_left: float) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up now (the wait exceeds the budget)."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        # Only delta-seconds are honoured; HTTP-date and fractional values deliberately get our own backoff
+        if retry_after and retry_after.isdigit():
+            requested = float(retry_after)
+        else:
+            requested = HTTP_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+        if requested > budget_left:
+            return None
+        return min(requested, HTTP_MAX_BACKOFF_SECONDS)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transport errors and 429/5xx responses."""
+        self.requests += 1
+        self.in_flight += 1
+        budget_left = HTTP_RETRY_BUDGET_SECONDS
+        try:
+            for attempt in range(HTTP_MAX_RETRIES + 1):
+                response = None
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                    if response.status_code not in RETRY_STATUSES:
+                        return response
+                except httpx.TransportError:
+                    delay = self._backoff(attempt, None, budget_left) if attempt < HTTP_MAX_RETRIES else None
+                    if delay is None:
+                        self.failures += 1
+                        raise
+                else:
+                    delay = self._backoff(attempt, response, budget_left) if attempt < HTTP_MAX_RETRIES else None
+                    if delay is None:
+                        # Out of attempts, or the server asked for a longer pause than we will wait
+                        self.failures += 1
+                        return response
+                self.retries += 1
+                budget_left -= delay
+                await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def metrics(self) -> dict:
+        # httpx does not expose pool statistics publicly; read them defensively
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "pool_connections": len(connections),
+            "pool_idle_connections": sum(1 for c in connections if c.is_idle()),
+            "http2": self.http2,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client: Optional[OutboundHTTPClient] = None
+
+
+def create_http_client() -> OutboundHTTPClient:
+    """Create the shared client (called from the FastAPI lifespan)."""
+    global _client
+    if _client is None:
+        _client = OutboundHTTPClient()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> OutboundHTTPClient:
+    """FastAPI dependency returning the shared outbound HTTP client."""
+    return _client or create_http_client()
@@ -0,0 +1,63 @@
+"""
+LLM Client
+One long-lived AsyncGroq client shared by every chat request. Its pooled
+httpx client keeps connections to the Groq API alive between requests, so
+a chat turn does not pay for a new TCP/TLS handshake or tie up a thread
+while the model generates.
+"""
+import os
+
+import httpx
+from fastapi import HTTPException
+
+from .structured_logging import get_logger
+
+logger = get_logger("llm")
+
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+_client = None
+
+
+def create_llm_client():
+    """Create the shared client (called from the FastAPI lifespan)."""
+    global _client
+    if _client is not None:
+        return _client
+    try:
+        from groq import AsyncGroq
+    except ImportError:
+        logger.warning("Groq library not installed")
+        return None
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logger.warning("GROQ_API_KEY not set in environment")
+        return None
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=60.0,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0),
+    )
+    _client = AsyncGroq(api_key=api_key, http_client=http_client)
+    return _client
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_llm_client():
+    """FastAPI dependency returning the shared AsyncGroq client."""
+    client = _client or create_llm_client()
+    if client is None:
+        raise HTTPException(status_code=500, detail="AI inference unavailable: Groq client not configured")
+    return client
@@ -0,0 +1,301 @@
+"""
+Metrics
+In-process counters, gauges and histograms, rendered in the Prometheus text
+exposition format on GET /metrics. Like the other stats in this app they are
+per worker; Prometheus aggregates across workers by scraping each one (or
+summing over the `instance` label).
+
+Recorded here:
+- every HTTP request: latency histogram, count by status and in-flight gauge,
+  labelled by route template (so /papers/123 and /papers/456 share a series),
+  plus one structured access-log line
+- every chat turn: a latency histogram per stage (workspace lookup,
+  conversation/history load, query encoding, retrieval stages, prompt
+  packing, LLM call, DB commits)
+- every LLM call: latency and prompt/completion token counts
+- at scrape time: hit rates of the answer, search and auth caches, and the
+  queues of the embedding service and the password hashing pool
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+from starlette.routing import Match
+
+from . import embedding_service, password_hashing
+from .answer_cache import answer_cache
+from .principal_cache import principal_cache
+from .search_cache import search_cache
+from .structured_logging import ACCESS_LOG, get_logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+access_logger = get_logger("access")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: tuple, value) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = HTTP_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                series = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def _render_series(self, key: tuple, series) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series):
+            cumulative += count
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-1])}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # Called at scrape time: yield (name, type, help, [(labels dict, value)])
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], Iterable[tuple]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, type_, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {type_}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = Counter(
+    "researchhub_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "researchhub_http_request_duration_seconds",
+    "HTTP request latency until the last response byte, by route template.",
+    ("method", "route"),
+    HTTP_BUCKETS,
+)
+http_requests_in_flight = Gauge(
+    "researchhub_http_requests_in_flight", "HTTP requests currently being served.", ("method", "route")
+)
+chat_stage_duration = Histogram(
+    "researchhub_chat_stage_duration_seconds", "Latency of each stage of a chat turn.", ("stage",), STAGE_BUCKETS
+)
+llm_request_duration = Histogram(
+    "researchhub_llm_request_duration_seconds",
+    "LLM API call latency (until the last streamed token), by purpose and outcome.",
+    ("purpose", "outcome"),
+    STAGE_BUCKETS,
+)
+llm_tokens = Counter(
+    "researchhub_llm_tokens_total", "LLM tokens used, by purpose and kind (prompt/completion).", ("purpose", "kind")
+)
+
+
+def observe_chat_timings(timings_ms: Dict[str, float]):
+    for stage, ms in timings_ms.items():
+        chat_stage_duration.observe(ms / 1000, stage=stage)
+
+
+def record_llm_call(purpose: str, seconds: float, outcome: str = "ok", prompt_tokens: int = 0, completion_tokens: int = 0):
+    llm_request_duration.observe(seconds, purpose=purpose, outcome=outcome)
+    if prompt_tokens:
+        llm_tokens.inc(prompt_tokens, purpose=purpose, kind="prompt")
+    if completion_tokens:
+        llm_tokens.inc(completion_tokens, purpose=purpose, kind="completion")
+
+
+def _cache_samples():
+    caches = {
+        "answer": answer_cache.stats(),
+        "search": search_cache.stats(),
+        "auth": principal_cache.stats(),
+    }
+    hits = {
+        "answer": lambda s: s["exact_hits"] + s["semantic_hits"],
+        "search": lambda s: s["hits"] + s["coalesced"],
+        "auth": lambda s: s["hits"],
+    }
+    yield ("researchhub_cache_hits_total", "counter", "Cache lookups answered from the cache.",
+           [({"cache": name}, hits[name](stats)) for name, stats in caches.items()])
+    yield ("researchhub_cache_misses_total", "counter", "Cache lookups that missed.",
+           [({"cache": name}, stats["misses"]) for name, stats in caches.items()])
+    yield ("researchhub_cache_hit_ratio", "gauge", "Hits / lookups since the worker started.",
+           [({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()])
+    yield ("researchhub_cache_entries", "gauge", "Entries currently held.",
+           [({"cache": name}, stats["entries"]) for name, stats in caches.items()])
+
+
+def _queue_samples():
+    service = embedding_service._service
+    if service is not None:
+        stats = service.metrics()
+        yield ("researchhub_embedding_queue_depth", "gauge", "Texts waiting for the embedding worker.",
+               [({}, stats["queue_depth"])])
+        yield ("researchhub_embedding_batches_total", "counter", "Micro-batches encoded.", [({}, stats["batches"])])
+        yield ("researchhub_embedding_texts_total", "counter", "Texts encoded.", [({}, stats["texts"])])
+        yield ("researchhub_embedding_rejected_total", "counter", "Encode requests rejected by backpressure.",
+               [({}, stats["rejected"])])
+    hasher = password_hashing._hasher
+    if hasher is not None:
+        stats = hasher.metrics()
+        yield ("researchhub_password_hash_pending", "gauge", "Hash/verify jobs queued or running.",
+               [({}, stats["pending"])])
+        yield ("researchhub_password_hash_rejected_total", "counter", "Hash/verify jobs rejected by backpressure.",
+               [({}, stats["rejected"])])
+
+
+registry.add_collector(_cache_samples)
+registry.add_collector(_queue_samples)
+
+
+def _route_template(scope) -> str:
+    """The matching route's path template; bounded label values, unlike raw paths."""
+    app = scope.get("app")
+    partial = None
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware (no per-request task or body buffering, unlike
+    @app.middleware("http")): times each request until its last body chunk,
+    so streamed chat responses are measured in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method, route=route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec(method=method, route=route)
+            # No response start: the app raised, and the server answers 500
+            status = status or 500
+            http_requests.inc(method=method, route=route, status=status)
+            http_request_duration.observe(duration, method=method, route=route)
+            if ACCESS_LOG:
+                access_logger.info("request", extra={"fields": {
+                    "method": method,
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                }})
@@ -0,0 +1,47 @@
+"""
+Keyset Pagination Helpers
+Cursors are opaque URL-safe strings encoding the sort key of the last row
+returned, so the next page is a single index range seek instead of OFFSET.
+"""
+from datetime import datetime
+from typing import Any, List
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> List[Any]:
+    """
+    Decode a cursor holding one value per entry of `types`: int, datetime, or a
+    tuple of alternatives such as (int, None) for a nullable key. Datetimes are
+    parsed; raises 400 for malformed cursors and values of the wrong type.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return [_decode_value(value, expected) for value, expected in zip(values, types)]
+
+
+def _decode_value(value: Any, expected) -> Any:
+    for kind in expected if isinstance(expected, tuple) else (expected,):
+        if kind is None and value is None:
+            return None
+        # bool is an int subclass, but never a sort key
+        if kind is int and isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if kind is datetime and isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
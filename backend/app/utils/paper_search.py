@@ -0,0 +1,138 @@
+"""
+Workspace Full-Text Search
+BM25-ranked search over a workspace's papers, backed by the SQLite FTS5 index
+`papers_fts` (migration 0005). User input is reduced to plain terms, so FTS5
+query syntax in it can neither error nor widen the match.
+
+On other databases the same functions fall back to case-insensitive LIKE
+matching, without ranking or snippets.
+"""
+from typing import List, Optional
+import html
+import re
+
+from sqlalchemy import and_, or_, select, text
+
+from .. import models
+from ..database import DATABASE_URL
+
+FTS_AVAILABLE = DATABASE_URL.startswith("sqlite")
+
+# Relative weight of a match in title, authors, abstract (workspace_id is only a filter)
+BM25_WEIGHTS = "10.0, 5.0, 1.0, 0.0"
+SNIPPET_TOKENS = 24
+
+_TERM = re.compile(r"(\w+)(\*?)", re.UNICODE)
+# Dropped from natural-language questions before lexical ranking: matched as OR-terms
+# they would pull in nearly every paper and drown out the rare, exact terms
+STOPWORDS = frozenset("""
+    a about above after all also an and any are as at be been being but by can could did do does
+    for from had has have how i if in into is it its me more most my no not of on or our out over
+    please show so some such than that the their them then there these they this those to under
+    up us was we were what when where which while who whom why will with would you your
+    tell explain describe summarize summarise compare known paper papers study studies
+""".split())
+# Private-use sentinels around matches; the snippet is HTML-escaped before they become <mark>
+_OPEN, _CLOSE = "\ue000", "\ue001"
+
+
+def search_terms(query: str) -> List[tuple]:
+    """(term, is_prefix) pairs; a trailing * on a term asks for a prefix match."""
+    return [(term, bool(star)) for term, star in _TERM.findall(query)]
+
+
+def fts_query(query: str, prefix_last: bool = True, match_any: bool = False) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression from free text: every term quoted, the last
+    one (search-as-you-type) or any typed with * matched as a prefix. Terms are
+    ANDed unless match_any. None if the text has no searchable terms.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    parts = []
+    for i, (term, is_prefix) in enumerate(terms):
+        quoted = '"' + term + '"'
+        if is_prefix or (prefix_last and i == len(terms) - 1):
+            quoted += "*"
+        parts.append(quoted)
+    return (" OR " if match_any else " AND ").join(parts)
+
+
+def _snippet_html(snippet: Optional[str]) -> Optional[str]:
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+_FTS_SEARCH = text(f"""
+    SELECT papers.id, papers.title, papers.authors, papers.year, papers.source,
+           -bm25(papers_fts, {BM25_WEIGHTS}) AS score,
+           snippet(papers_fts, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet
+    FROM papers_fts JOIN papers ON papers.id = papers_fts.rowid
+    WHERE papers_fts MATCH :match
+    ORDER BY bm25(papers_fts, {BM25_WEIGHTS})
+    LIMIT :limit
+""")
+
+_FTS_RANK = text(f"""
+    SELECT rowid FROM papers_fts
+    WHERE papers_fts MATCH :match
+    ORDER BY bm25(papers_fts, {BM25_WEIGHTS})
+    LIMIT :limit
+""")
+
+
+def _scoped(workspace_id: int, match: str) -> str:
+    # The workspace_id column is indexed, so this narrows the match inside FTS5 itself
+    return f'workspace_id:"{int(workspace_id)}" AND ({match})'
+
+
+def _like_filter(query: str, match_any: bool = False):
+    conditions = [
+        or_(models.Paper.title.ilike(f"%{term}%"), models.Paper.abstract.ilike(f"%{term}%"))
+        for term, _ in search_terms(query)
+    ]
+    return or_(*conditions) if match_any else and_(*conditions)
+
+
+async def search_library(db, workspace_id: int, query: str, limit: int = 20, prefix: bool = True) -> List[dict]:
+    """
+    Best-matching papers of a workspace, most relevant first, each with a BM25
+    score (higher is better) and an HTML snippet with matches in <mark>.
+    """
+    match = fts_query(query, prefix_last=prefix)
+    if match is None:
+        return []
+    if not FTS_AVAILABLE:
+        rows = (await db.execute(
+            select(models.Paper.id, models.Paper.title, models.Paper.authors, models.Paper.year, models.Paper.source)
+            .where(models.Paper.workspace_id == workspace_id, _like_filter(query))
+            .order_by(models.Paper.id.desc())
+            .limit(limit)
+        )).all()
+        return [dict(row._mapping, score=None, snippet=None) for row in rows]
+
+    rows = (await db.execute(_FTS_SEARCH, {
+        "match": _scoped(workspace_id, match), "limit": limit, "open": _OPEN, "close": _CLOSE,
+    })).all()
+    return [dict(row._mapping, snippet=_snippet_html(row.snippet)) for row in rows]
+
+
+async def lexical_rank(db, workspace_id: int, query: str, limit: int) -> List[int]:
+    """
+    Paper ids of a workspace ranked by BM25 against a natural-language question.
+    Any non-stopword term may match, so exact names and acronyms surface even
+    when the rest of the question does not appear in the paper.
+    """
+    keywords = " ".join(term for term, _ in search_terms(query) if term.lower() not in STOPWORDS)
+    match = fts_query(keywords, prefix_last=False, match_any=True)
+    if match is None:
+        return []
+    if not FTS_AVAILABLE:
+        return list(await db.scalars(
+            select(models.Paper.id)
+            .where(models.Paper.workspace_id == workspace_id, _like_filter(keywords, match_any=True))
+            .limit(limit)
+        ))
+    return list(await db.scalars(_FTS_RANK, {"match": _scoped(workspace_id, match), "limit": limit}))
@@ -0,0 +1,151 @@
+"""
+Password Hashing
+bcrypt hashing and verification run in a small dedicated process pool, so a
+burst of logins or registrations neither holds FastAPI's threadpool nor
+competes for the GIL with chat and search requests.
+
+The pool accepts at most PASSWORD_HASH_MAX_PENDING jobs; beyond that callers
+get a 503 with Retry-After instead of queueing without bound. Hashes made
+with a cost factor other than BCRYPT_ROUNDS are flagged as needing an update
+when they are verified, so changing the cost rehashes passwords on next login.
+
+Created and shut down in the FastAPI lifespan; routers receive it through the
+get_password_hasher dependency.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# min == max == default: any other cost factor counts as outdated
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+# Pool workers: module-level so they can be pickled. Each returns its start time
+# so the parent can measure how long the job waited in the queue.
+
+def _noop() -> None:
+    return None
+
+
+def _hash(password: str) -> Tuple[str, float]:
+    started = time.time()
+    return pwd_context.hash(password), started
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[Tuple[bool, Optional[str]], float]:
+    started = time.time()
+    return pwd_context.verify_and_update(password, hashed), started
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        # spawn: forking a process that already runs threads (uvicorn, torch) can deadlock
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        # Start the workers now rather than on the first login (spawning costs ~1s each)
+        for _ in range(workers):
+            self._executor.submit(_noop)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.run_time_total = 0.0
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Authentication is busy, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        submitted = time.time()
+        try:
+            result, started = await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+        finished = time.time()
+        with self._lock:
+            self.completed += 1
+            wait = max(0.0, started - submitted)
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self.run_time_total += finished - started
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Return (valid, new_hash); new_hash is set when the stored hash uses an outdated cost factor."""
+        valid, new_hash = await self._run(_verify_and_update, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": BCRYPT_ROUNDS,
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.workers),
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_queue_wait_ms": 1000 * self.queue_wait_total / self.completed if self.completed else 0.0,
+                "max_queue_wait_ms": 1000 * self.queue_wait_max,
+                "avg_hash_ms": 1000 * self.run_time_total / self.completed if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def create_password_hasher() -> PasswordHasher:
+    """Create the shared hashing pool (called from the FastAPI lifespan)."""
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher()
+    return _hasher
+
+
+def close_password_hasher():
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """FastAPI dependency returning the shared password hashing pool."""
+    return _hasher or create_password_hasher()
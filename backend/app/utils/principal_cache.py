@@ -0,0 +1,84 @@
+"""
+Principal Cache
+Short-lived, bounded in-process cache of validated bearer token -> user
+principal, so repeated requests with the same token skip the JWT decode and
+the users lookup.
+
+An entry never outlives the token's own `exp` claim. Updating or deleting a
+user through the ORM drops that user's entries at once; changes made by other
+processes are picked up after at most AUTH_CACHE_TTL_SECONDS.
+"""
+from collections import OrderedDict
+from typing import Any, Optional
+import os
+import threading
+import time
+
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        ttl_seconds: float = AUTH_CACHE_TTL_SECONDS,
+        max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+        enabled: bool = AUTH_CACHE_ENABLED,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # token -> (principal, expires_at as wall-clock time), in LRU order
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, principal: Any, token_expires_at: float):
+        """Cache principal for token until the TTL or the token's expiry, whichever is sooner."""
+        if not self.enabled:
+            return
+        expires_at = min(time.time() + self.ttl_seconds, token_expires_at)
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in [t for t, (p, _) in self._entries.items() if p.id == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()
@@ -1,81 +1,285 @@
 """
 Research Assistant Utility
-Uses sentence-transformers to create embeddings for paper abstracts
-and retrieves the most relevant context for AI chat responses.
+Creates embeddings for paper abstracts, reranks retrieved papers and builds
+the context for AI chat responses (retrieval itself is in vector_index and
+retrieval).
+
+Embeddings come from a pluggable backend (EMBEDDING_BACKEND):
+
+- torch: the sentence-transformers PyTorch model (default)
+- onnx:  an int8-quantized ONNX export of the same model on ONNX Runtime,
+         without loading torch; much smaller and faster on CPU-only nodes
+
+Both produce all-MiniLM-L6-v2 vectors that agree to within the tolerance
+checked by check_embedding_parity.py, so stored embeddings stay valid when
+switching backends. Export the ONNX model with export_onnx_embedding.py.
 """
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+import asyncio
+import hashlib
+import os
+import threading
 import numpy as np
 
-# Lazy-load the model to avoid slow startup
+from .structured_logging import get_logger
+
+logger = get_logger("research_assistant")
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Directory holding model_quantized.onnx and tokenizer.json (written by export_onnx_embedding.py)
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./models/all-MiniLM-L6-v2-onnx-int8")
+# ONNX Runtime intra-op threads per worker; 0 lets ONNX Runtime use every core
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+# Word pieces the model was trained on; longer inputs are truncated (as sentence-transformers does)
+EMBEDDING_MAX_SEQ_LENGTH = 256
+# Cross-encoder for optional reranking of retrieved papers; empty disables reranking
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Threads for cross-encoder reranking, off the event loop and Starlette's request threadpool
+# (embedding requests go through the micro-batching EmbeddingService instead)
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RERANK_WORKERS", "2")),
+    thread_name_prefix="rerank",
+)
+
+
+class EmbeddingBackend:
+    """
+    Interface of an embedding backend: encode() takes a string or a list of
+    strings and returns L2-normalized float32 vectors, shape (dim,) for a
+    string and (n, dim) for a list. Mirrors SentenceTransformer.encode, so
+    extra keyword arguments (convert_to_numpy, normalize_embeddings) are accepted.
+    """
+
+    name = ""
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TorchEmbeddingBackend(EmbeddingBackend):
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        vectors = self.model.encode(
+            sentences, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    Runs the quantized export with ONNX Runtime and reproduces the
+    sentence-transformers pipeline around it: WordPiece tokenization, mean
+    pooling over the attention mask, L2 normalization.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str = EMBEDDING_ONNX_DIR, threads: int = EMBEDDING_ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=EMBEDDING_MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads
+        # Calls come from the embedding executor's threads; don't spin extra ones between them
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model_quantized.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        # last_hidden_state: (batch, sequence, dim)
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        # Batch texts of similar length together so little compute goes to padding
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            vectors[batch] = self._encode_batch([texts[i] for i in batch])
+        return vectors[0] if single else vectors
+
+
+EMBEDDING_BACKENDS = {
+    TorchEmbeddingBackend.name: TorchEmbeddingBackend,
+    OnnxEmbeddingBackend.name: OnnxEmbeddingBackend,
+}
+
+
+def create_embedding_backend(name: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+    return EMBEDDING_BACKENDS[name]()
+
+
+# Lazy-load the models to avoid slow startup
 _model = None
+# Loads the embedding model once and serializes its use: the EmbeddingService thread
+# is the main caller, but index rebuilds (embed_papers) run on the request threadpool
+_model_lock = threading.RLock()
+_reranker = None
+_reranker_loaded = False
 
 
-def _get_model():
+def _get_model() -> Optional[EmbeddingBackend]:
     global _model
     if _model is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            _model = SentenceTransformer("all-MiniLM-L6-v2")
-        except Exception as e:
-            print(f"[ResearchAssistant] Warning: Could not load embedding model: {e}")
-            _model = None
+        with _model_lock:
+            if _model is None:
+                try:
+                    _model = create_embedding_backend()
+                except Exception as e:
+                    logger.warning("Could not load %s embedding backend: %s", EMBEDDING_BACKEND, e)
     return _model
 
 
-def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    a_norm = np.linalg.norm(a)
-    b_norm = np.linalg.norm(b)
-    if a_norm == 0 or b_norm == 0:
-        return 0.0
-    return float(np.dot(a, b) / (a_norm * b_norm))
+def encode_texts(texts: Union[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE) -> Optional[np.ndarray]:
+    """L2-normalized float32 embeddings of texts, or None if the model is unavailable."""
+    with _model_lock:
+        model = _get_model()
+        if model is None:
+            return None
+        return np.asarray(
+            model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True),
+            dtype=np.float32,
+        )
+
+
+def _get_reranker():
+    global _reranker, _reranker_loaded
+    if not _reranker_loaded:
+        _reranker_loaded = True
+        if RERANK_MODEL_NAME:
+            try:
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(RERANK_MODEL_NAME)
+            except Exception as e:
+                logger.warning("Could not load rerank model: %s", e)
+    return _reranker
+
+
+def paper_text(paper) -> str:
+    """Text that gets embedded for a paper (title + abstract, truncated)."""
+    return f"{paper.title}. {paper.abstract or ''}"[:512]
+
+
+def content_hash(paper) -> str:
+    return hashlib.sha256(paper_text(paper).encode("utf-8")).hexdigest()
+
 
+def embedding_is_stale(paper) -> bool:
+    """True if the stored embedding is missing or was built from other text or another model."""
+    return (
+        paper.embedding is None
+        or paper.embedding_model != EMBEDDING_MODEL_NAME
+        or paper.embedding_hash != content_hash(paper)
+    )
 
-def get_relevant_papers(query: str, papers: list, top_k: int = 5) -> list:
+
+def load_embedding(paper) -> np.ndarray:
+    return np.frombuffer(paper.embedding, dtype=np.float32)
+
+
+def embed_papers(papers: list) -> int:
     """
-    Return the top_k most relevant papers based on embedding similarity to query.
-    Falls back to returning all papers if the model is unavailable.
+    (Re)compute and store embeddings for every stale Paper in one batched encode.
+    Returns the number of papers modified (caller is responsible for committing).
     """
+    stale = [p for p in papers if embedding_is_stale(p)]
+    if not stale:
+        return 0
+
+    vectors = encode_texts([paper_text(p) for p in stale])
+    if vectors is None:
+        return 0
+    store_embeddings(stale, vectors)
+    return len(stale)
+
+
+def store_embeddings(papers: list, vectors: np.ndarray):
+    """Set the embedding columns of papers from their freshly encoded paper_text vectors."""
+    for paper, vector in zip(papers, np.asarray(vectors, dtype=np.float32)):
+        paper.embedding = vector.tobytes()
+        paper.embedding_model = EMBEDDING_MODEL_NAME
+        paper.embedding_hash = content_hash(paper)
+
+
+def rerank(query: str, papers: list, top_k: int) -> Optional[list]:
+    """Reorder papers by cross-encoder relevance to the query; None if no rerank model is available."""
+    reranker = _get_reranker()
+    if reranker is None:
+        return None
     if not papers:
         return []
+    scores = np.asarray(reranker.predict([(query, paper_text(p)) for p in papers]), dtype=np.float32)
+    return [papers[i] for i in top_k_indices(scores, top_k)]
+
+
+async def rerank_async(query: str, papers: list, top_k: int) -> Optional[list]:
+    """rerank on the rerank executor, off the event loop and the request threadpool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, rerank, query, papers, top_k)
 
-    model = _get_model()
-    if model is None:
-        return papers[:top_k]
 
-    query_embedding = model.encode(query, convert_to_numpy=True)
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first, without a full sort."""
+    if top_k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, top_k)[:top_k]
+    return candidates[np.argsort(-scores[candidates])]
 
-    scored = []
-    for paper in papers:
-        text = f"{paper.title}. {paper.abstract or ''}"
-        paper_embedding = model.encode(text[:512], convert_to_numpy=True)
-        score = cosine_similarity(query_embedding, paper_embedding)
-        scored.append((score, paper))
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [p for _, p in scored[:top_k]]
+def paper_passage(index: int, paper, abstract: Optional[str] = None) -> str:
+    """Prompt context entry for a paper; abstract overrides the stored one (e.g. a truncated copy)."""
+    authors = paper.authors or "Unknown authors"
+    year = f"({paper.year})" if paper.year else ""
+    abstract = abstract if abstract is not None else (paper.abstract or "No abstract available.")
+    return (
+        f"[Paper {index}] \"{paper.title}\" by {authors} {year}\n"
+        f"Abstract: {abstract}"
+    )
 
 
-def build_system_prompt(relevant_papers: list) -> str:
-    """Build a system prompt containing the relevant paper context."""
-    if not relevant_papers:
+def build_system_prompt(paper_passages: List[str], summary: Optional[str] = None) -> str:
+    """Build a system prompt from formatted paper passages and the conversation's rolling summary."""
+    summary_str = f"\n\nSummary of the earlier conversation:\n{summary}" if summary else ""
+    if not paper_passages:
         return (
             "You are ResearchHub AI, an expert research assistant. "
             "The current workspace has no imported papers yet. "
             "Help the user understand research topics based on your general knowledge. "
             "Be concise, accurate, and scholarly."
-        )
-
-    papers_context = []
-    for i, paper in enumerate(relevant_papers, 1):
-        authors = paper.authors or "Unknown authors"
-        year = f"({paper.year})" if paper.year else ""
-        abstract = paper.abstract or "No abstract available."
-        papers_context.append(
-            f"[Paper {i}] \"{paper.title}\" by {authors} {year}\n"
-            f"Abstract: {abstract[:600]}"
-        )
+        ) + summary_str
 
-    context_str = "\n\n".join(papers_context)
+    context_str = "\n\n".join(paper_passages)
 
     return f"""You are ResearchHub AI, an expert AI research assistant with deep knowledge of academic literature.
 You have access to the following research papers from the user's workspace:
@@ -88,4 +292,4 @@ Instructions:
 - Synthesize information across multiple papers when relevant.
 - Be concise, accurate, and scholarly in tone.
 - If the question is outside the scope of the provided papers, use your general knowledge but mention it.
-- Format your responses with clear structure when listing multiple points."""
+- Format your responses with clear structure when listing multiple points.{summary_str}"""
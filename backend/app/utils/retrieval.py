@@ -0,0 +1,121 @@
+"""
+Chat Context Retrieval
+Selects the papers placed in a chat turn's prompt. Three modes:
+
+- dense:   cosine similarity of MiniLM embeddings (the workspace vector index)
+- lexical: BM25 over the FTS5 index, which catches exact gene/dataset names
+           and acronyms that embeddings blur together
+- hybrid:  both rankers run concurrently and are merged with reciprocal rank
+           fusion (RRF), so a paper ranked well by either one makes the cut
+
+Any mode can rerank its top candidates with a cross-encoder. Every stage is
+timed and the timings are returned alongside the papers.
+"""
+from typing import Dict, List, Optional
+import asyncio
+import os
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from .. import models
+from ..database import run_in_sync_session
+from .paper_search import lexical_rank
+from .research_assistant import rerank_async
+from .vector_index import rank_workspace, search_workspace
+
+RETRIEVAL_MODE = os.getenv("CHAT_RETRIEVAL_MODE", "dense")
+RETRIEVAL_RERANK = os.getenv("CHAT_RETRIEVAL_RERANK", "false").lower() == "true"
+# Candidates each ranker contributes to fusion / reranking
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "30"))
+# RRF damping constant; 60 is the value from the original RRF paper
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> List[int]:
+    """Merge ranked id lists: score(id) = sum over lists of 1 / (k + rank)."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, paper_id in enumerate(ranking, 1):
+            scores[paper_id] = scores.get(paper_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda paper_id: -scores[paper_id])
+
+
+def retrieval_options(mode: Optional[str], rerank: Optional[bool]) -> tuple:
+    """(mode, rerank) for a chat request, falling back to the server defaults."""
+    return mode or RETRIEVAL_MODE, RETRIEVAL_RERANK if rerank is None else rerank
+
+
+class Retrieval:
+    """Papers chosen for the prompt plus per-stage timings in milliseconds."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.reranked = False
+        self.papers: list = []
+        self.timings_ms: Dict[str, float] = {}
+
+    async def timed(self, stage: str, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings_ms[stage] = round((time.perf_counter() - started) * 1000, 2)
+
+
+async def _load_papers(db, workspace_id: int, paper_ids: List[int]) -> list:
+    if not paper_ids:
+        return []
+    rows = (await db.scalars(
+        select(models.Paper).where(models.Paper.workspace_id == workspace_id, models.Paper.id.in_(paper_ids))
+    )).all()
+    by_id = {p.id: p for p in rows}
+    return [by_id[i] for i in paper_ids if i in by_id]
+
+
+async def retrieve(
+    db,
+    workspace_id: int,
+    query: str,
+    query_embedding: Optional[np.ndarray],
+    top_k: int = 5,
+    mode: Optional[str] = None,
+    rerank: Optional[bool] = None,
+) -> Retrieval:
+    mode, rerank = retrieval_options(mode, rerank)
+    result = Retrieval(mode)
+    started = time.perf_counter()
+
+    if mode == "dense" and not rerank:
+        # Unchanged fast path: ids and rows straight from the vector index
+        result.papers = await result.timed(
+            "dense", run_in_sync_session(search_workspace, workspace_id, query_embedding, top_k)
+        )
+        result.timings_ms["total"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    candidates = max(top_k, RETRIEVAL_CANDIDATES)
+    jobs = []
+    if mode in ("dense", "hybrid") and query_embedding is not None:
+        jobs.append(result.timed(
+            "dense", run_in_sync_session(rank_workspace, workspace_id, query_embedding, candidates)
+        ))
+    if mode in ("lexical", "hybrid") or query_embedding is None:
+        jobs.append(result.timed("lexical", lexical_rank(db, workspace_id, query, candidates)))
+    # The dense ranker has its own session, so both can run at once
+    rankings = await asyncio.gather(*jobs)
+
+    fuse_started = time.perf_counter()
+    fused = reciprocal_rank_fusion(rankings) if len(rankings) > 1 else (rankings[0] if rankings else [])
+    result.timings_ms["fuse"] = round((time.perf_counter() - fuse_started) * 1000, 2)
+
+    keep = fused[:candidates] if rerank else fused[:top_k]
+    papers = await result.timed("load", _load_papers(db, workspace_id, keep))
+    if rerank:
+        reranked = await result.timed("rerank", rerank_async(query, papers, top_k))
+        if reranked is not None:
+            papers, result.reranked = reranked, True
+    result.papers = papers[:top_k]
+    result.timings_ms["total"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
@@ -0,0 +1,143 @@
+"""
+Search Cache
+Bounded TTL cache for external paper searches with request coalescing:
+concurrent identical searches share a single upstream request (single-flight).
+
+Set SEARCH_CACHE_PATH to also keep entries in a local SQLite file, so the
+cache survives restarts and is shared by all workers on the host.
+"""
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH")
+
+
+def search_key(query: str, per_page: int) -> str:
+    return f"{per_page}:{' '.join(query.lower().split())}"
+
+
+class _DiskStore:
+    """Tiny SQLite key/value table of JSON-encoded entries with expiry times."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM search_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value, expires_at: float):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),))
+
+
+class SearchCache:
+    def __init__(
+        self,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        path: Optional[str] = SEARCH_CACHE_PATH,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disk = _DiskStore(path) if path else None
+        # key -> (value, expires_at as wall-clock time)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get_memory(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _set_memory(self, key: str, value, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        if self.disk is not None:
+            cached = await asyncio.to_thread(self.disk.get, key)
+            if cached is not None:
+                self._set_memory(key, *cached)
+                return cached[0]
+        value = await fetch()
+        expires_at = time.time() + self.ttl_seconds
+        self._set_memory(key, value, expires_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at)
+        return value
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        """
+        Return the cached value for key, or run fetch() once for all concurrent
+        callers asking for the same key. Values must be JSON-serializable.
+        Failed fetches are not cached.
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            # Run as its own task so a cancelled caller doesn't abort the shared fetch
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "disk": self.disk is not None,
+        }
+
+
+search_cache = SearchCache()
@@ -0,0 +1,77 @@
+"""
+Structured Logging
+Application logs go through the standard logging module under the
+"researchhub" logger, one record per line, as JSON (LOG_FORMAT=json, default)
+or key=value text. Structured fields are passed as extra={"fields": {...}}.
+
+Handlers never write on the request path: records are put on an in-memory
+queue and written to stderr by a background thread (QueueHandler +
+QueueListener), so logging a request costs a queue append, not a blocking
+write to the terminal or a log pipe.
+"""
+from typing import Optional
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# One line per HTTP request (method, route, status, duration)
+ACCESS_LOG = os.getenv("ACCESS_LOG", "true").lower() == "true"
+
+ROOT_LOGGER = "researchhub"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging():
+    """Route the "researchhub" loggers through the background writer (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=False)
+    _listener.start()
+    # Flush what is still queued when the worker exits
+    atexit.register(_listener.stop)
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,266 @@
+"""
+Per-workspace Vector Index
+Serves nearest-paper lookups for recently used workspaces so a chat turn only
+has to encode the query and scan (or ANN-search) one matrix.
+
+Flat indexes scan the workspace's memory-mapped embedding store directly, so
+uvicorn workers share the vectors through the page cache. Indexes are built
+lazily on first use, updated incrementally on import and delete, re-synced
+when another worker changed the workspace (the store's version is behind the
+workspace's paper_version), and evicted LRU once the configured memory budget
+is exceeded.
+"""
+from collections import OrderedDict
+from typing import List, Optional
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from .. import models
+from .embedding_store import TOMBSTONE, WorkspaceEmbeddingStore
+from .research_assistant import (
+    EMBEDDING_MODEL_NAME,
+    embed_papers,
+    load_embedding,
+    top_k_indices,
+)
+
+# Workspaces with at least this many papers use an HNSW index when hnswlib is installed
+ANN_THRESHOLD = int(os.getenv("VECTOR_INDEX_ANN_THRESHOLD", "5000"))
+MAX_BYTES = int(os.getenv("VECTOR_INDEX_MAX_MB", "256")) * 1024 * 1024
+# Rows converted from float16 to float32 at a time during a flat scan
+SCAN_CHUNK_ROWS = 16384
+
+
+def workspace_version(db: Session, workspace_id: int) -> int:
+    """The workspace's paper_version: changes whenever a paper is imported or deleted."""
+    return db.query(models.Workspace.paper_version).filter(models.Workspace.id == workspace_id).scalar() or 0
+
+
+def bump_paper_version(workspace_ids):
+    """
+    UPDATE incrementing paper_version of the given workspaces, returning
+    (workspace_id, new version) rows. Execute it in the transaction that
+    imports or deletes the papers, and pass the versions to the index.
+    """
+    return (
+        update(models.Workspace)
+        .where(models.Workspace.id.in_(list(workspace_ids)))
+        .values(paper_version=models.Workspace.paper_version + 1)
+        .returning(models.Workspace.id, models.Workspace.paper_version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+class WorkspaceIndex:
+    """Exact scan over a workspace embedding store, optionally backed by HNSW."""
+
+    def __init__(self, store: WorkspaceEmbeddingStore):
+        self.store = store
+        self.lock = threading.Lock()
+        self.ann = None
+        self.refresh()
+
+    def _map(self):
+        # Version before rows: a concurrent write can only leave the rows newer than the version (a rebuild), not older
+        self.version = self.store.read_version()
+        view = self.store.open_view()
+        if view is None:
+            view = np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float16)
+        self.ids, self.vectors = view
+        self.count = int((self.ids != TOMBSTONE).sum())
+
+    def refresh(self):
+        """Re-map the store (picking up writes from other workers) and rebuild HNSW if needed."""
+        self._map()
+        self.ann = None
+        if self.count >= ANN_THRESHOLD:
+            self._build_ann()
+
+    def _build_ann(self):
+        try:
+            import hnswlib
+        except ImportError:
+            return
+        live = self.ids != TOMBSTONE
+        ann = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+        ann.init_index(max_elements=max(int(live.sum()) * 2, 1024), ef_construction=200, M=16)
+        ann.add_items(np.asarray(self.vectors[live], dtype=np.float32), np.asarray(self.ids[live]))
+        ann.set_ef(64)
+        self.ann = ann
+
+    @property
+    def nbytes(self) -> int:
+        mapped = self.ids.nbytes + self.vectors.nbytes
+        if self.ann is not None:
+            # HNSW keeps a private float32 copy plus its graph
+            mapped += self.count * self.vectors.shape[1] * 4 * 2
+        return mapped
+
+    def add(self, paper_ids: List[int], vectors: np.ndarray, version: Optional[int] = None):
+        with self.lock:
+            known = set(self.ids.tolist())
+            keep = [i for i, pid in enumerate(paper_ids) if pid not in known]
+            if not keep:
+                return
+            paper_ids = [paper_ids[i] for i in keep]
+            vectors = np.asarray(vectors, dtype=np.float32)[keep]
+            self.store.append(paper_ids, vectors, version)
+            self._map()
+            if self.ann is not None:
+                needed = self.ann.get_current_count() + len(paper_ids)
+                if needed > self.ann.get_max_elements():
+                    self.ann.resize_index(max(needed, self.ann.get_max_elements() * 2))
+                self.ann.add_items(vectors, paper_ids)
+            elif self.count >= ANN_THRESHOLD:
+                self._build_ann()
+
+    def remove(self, paper_id: int, version: Optional[int] = None):
+        with self.lock:
+            self.store.tombstone(paper_id, version)
+            self._map()
+            if self.ann is not None:
+                try:
+                    self.ann.mark_deleted(paper_id)
+                except RuntimeError:
+                    pass  # not in the graph
+
+    def search(self, query: np.ndarray, top_k: int) -> List[int]:
+        with self.lock:
+            k = min(top_k, self.count)
+            if k == 0:
+                return []
+            if self.ann is not None:
+                labels, _ = self.ann.knn_query(query[None, :], k=k)
+                return [int(i) for i in labels[0]]
+
+            best_scores, best_ids = [], []
+            for start in range(0, len(self.ids), SCAN_CHUNK_ROWS):
+                ids = np.asarray(self.ids[start:start + SCAN_CHUNK_ROWS])
+                scores = np.asarray(self.vectors[start:start + SCAN_CHUNK_ROWS], dtype=np.float32) @ query
+                scores[ids == TOMBSTONE] = -np.inf
+                top = top_k_indices(scores, k)
+                best_scores.append(scores[top])
+                best_ids.append(ids[top])
+            scores, ids = np.concatenate(best_scores), np.concatenate(best_ids)
+            return [int(ids[i]) for i in top_k_indices(scores, k)]
+
+
+class VectorIndexRegistry:
+    """LRU map of workspace_id -> WorkspaceIndex bounded by a memory budget."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[int, WorkspaceIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _store(workspace_id: int) -> WorkspaceEmbeddingStore:
+        return WorkspaceEmbeddingStore(workspace_id, EMBEDDING_MODEL_NAME)
+
+    def _get(self, workspace_id: int) -> Optional[WorkspaceIndex]:
+        with self._lock:
+            index = self._indexes.get(workspace_id)
+            if index is not None:
+                self._indexes.move_to_end(workspace_id)
+            return index
+
+    def _put(self, workspace_id: int, index: WorkspaceIndex):
+        with self._lock:
+            self._indexes[workspace_id] = index
+            self._indexes.move_to_end(workspace_id)
+            total = sum(i.nbytes for i in self._indexes.values())
+            # Always keep the index we just built, even if it alone exceeds the budget
+            while total > self.max_bytes and len(self._indexes) > 1:
+                _, evicted = self._indexes.popitem(last=False)
+                total -= evicted.nbytes
+
+    def _rebuild_store(self, db: Session, workspace_id: int, index: WorkspaceIndex, version: int):
+        """Export the workspace's embeddings from the database (read after `version`) into its store."""
+        papers = db.query(models.Paper).filter(models.Paper.workspace_id == workspace_id).all()
+        if embed_papers(papers):
+            db.commit()
+        papers = [p for p in papers if p.embedding is not None]
+        if papers:
+            ids = np.array([p.id for p in papers], dtype=np.int64)
+            matrix = np.vstack([load_embedding(p) for p in papers])
+        else:
+            ids = np.empty(0, dtype=np.int64)
+            matrix = np.empty((0, 0), dtype=np.float32)
+        index.store.rewrite(ids, matrix, version)
+        index.refresh()
+
+    def get(self, db: Session, workspace_id: int) -> WorkspaceIndex:
+        """
+        Return the workspace index, building it on first use. The workspace's
+        paper_version detects imports or deletes made by other worker processes.
+        """
+        version = workspace_version(db, workspace_id)
+        index = self._get(workspace_id)
+        if index is None:
+            index = WorkspaceIndex(self._store(workspace_id))
+        elif index.version != version:
+            with index.lock:
+                index.refresh()
+        if index.version != version:
+            with index.lock:
+                self._rebuild_store(db, workspace_id, index, version)
+        self._put(workspace_id, index)
+        return index
+
+    def add_papers(self, workspace_id: int, paper_ids: List[int], vectors: np.ndarray, version: Optional[int] = None):
+        """version: the paper_version the import committed; pass None if some imported papers have no embedding."""
+        index = self._get(workspace_id)
+        if index is not None:
+            index.add(paper_ids, vectors, version)
+        else:
+            self._store(workspace_id).append(paper_ids, vectors, version)
+
+    def add_paper(self, workspace_id: int, paper_id: int, vector: np.ndarray, version: Optional[int] = None):
+        self.add_papers(workspace_id, [paper_id], vector[None, :], version)
+
+    def remove_paper(self, workspace_id: int, paper_id: int, version: Optional[int] = None):
+        index = self._get(workspace_id)
+        if index is not None:
+            index.remove(paper_id, version)
+        else:
+            self._store(workspace_id).tombstone(paper_id, version)
+
+    def drop(self, workspace_id: int):
+        with self._lock:
+            self._indexes.pop(workspace_id, None)
+        self._store(workspace_id).destroy()
+
+
+vector_indexes = VectorIndexRegistry()
+
+
+def rank_workspace(db: Session, workspace_id: int, query_embedding: np.ndarray, top_k: int) -> List[int]:
+    """Ids of the workspace's top_k papers by cosine similarity to an encoded query, best first."""
+    return vector_indexes.get(db, workspace_id).search(query_embedding, top_k)
+
+
+def search_workspace(db: Session, workspace_id: int, query_embedding: Optional[np.ndarray], top_k: int = 5) -> list:
+    """
+    Return the top_k most relevant Paper rows for an encoded query using the
+    workspace index. Only the matching rows are loaded from the database.
+    Without an embedding (model unavailable) the first top_k papers are returned.
+    """
+    if query_embedding is None:
+        return db.query(models.Paper).filter(
+            models.Paper.workspace_id == workspace_id
+        ).limit(top_k).all()
+
+    paper_ids = rank_workspace(db, workspace_id, query_embedding, top_k)
+    if not paper_ids:
+        return []
+
+    # A stale index entry (a deleted id reused elsewhere) must never surface another workspace's paper
+    rows = db.query(models.Paper).filter(
+        models.Paper.workspace_id == workspace_id, models.Paper.id.in_(paper_ids)
+    ).all()
+    by_id = {p.id: p for p in rows}
+    return [by_id[i] for i in paper_ids if i in by_id]
@@ -0,0 +1,134 @@
+"""
+Startup Warmup
+Loads everything a first request would otherwise pay for (the embedding model
+and a forward pass through it, the tokenizer, a database connection, the
+connection to the LLM API, the rerank model if reranking is on) right after
+the worker starts, and tracks readiness for the /ready probe.
+
+WARMUP_MODE:
+- background: the worker accepts requests at once; /ready turns 200 when warmup is done (default)
+- blocking:   startup waits for warmup, so the worker is ready as soon as it listens
+- off:        nothing is prewarmed (first requests load lazily); /ready is 200 immediately
+
+A step that fails is reported but does not block readiness, except the
+database: a worker that cannot reach its database is not ready.
+"""
+from typing import Dict, Optional
+import asyncio
+import os
+import time
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from ..database import open_session
+from .chat_context import load_tokenizer
+from .embedding_service import get_embedding_service
+from .llm import get_llm_client
+from .research_assistant import rerank_async
+from .retrieval import RETRIEVAL_RERANK
+from .structured_logging import get_logger
+
+logger = get_logger("warmup")
+
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+# Per-step limit, so a hung download or unreachable API cannot keep a worker unready forever
+WARMUP_STEP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_STEP_TIMEOUT_SECONDS", "120"))
+
+# Steps whose failure keeps the worker unready
+REQUIRED_STEPS = {"database"}
+
+
+async def _database():
+    async with open_session() as db:
+        await db.execute(text("SELECT 1"))
+
+
+async def _embedding_model():
+    # Loads the model on the embedding thread and runs one forward pass through it
+    if await get_embedding_service().encode("warmup") is None:
+        raise RuntimeError("embedding model unavailable")
+
+
+async def _tokenizer():
+    # May download the encoding on first use
+    if await run_in_threadpool(load_tokenizer) is None:
+        raise RuntimeError("tokenizer unavailable, token counts are estimated")
+
+
+async def _llm_connection():
+    # Opens a pooled TLS connection to the LLM API
+    await get_llm_client().models.list()
+
+
+async def _rerank_model():
+    await rerank_async("warmup", [], 1)
+
+
+class Readiness:
+    def __init__(self):
+        self.steps: Dict[str, dict] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        if WARMUP_MODE == "off":
+            return True
+        return self.finished_at is not None and all(
+            self.steps[name]["status"] == "ok" for name in REQUIRED_STEPS if name in self.steps
+        )
+
+    async def _step(self, name: str, fn):
+        self.steps[name] = {"status": "running"}
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(fn(), WARMUP_STEP_TIMEOUT_SECONDS)
+            self.steps[name] = {"status": "ok"}
+        except Exception as e:
+            self.steps[name] = {"status": "failed", "error": str(e) or type(e).__name__}
+            logger.warning("Warmup step failed", extra={"fields": {"step": name, "error": self.steps[name]["error"]}})
+        self.steps[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def run(self):
+        self.started_at = time.time()
+        steps = {
+            "database": _database,
+            "embedding_model": _embedding_model,
+            "tokenizer": _tokenizer,
+            "llm_connection": _llm_connection,
+        }
+        if RETRIEVAL_RERANK:
+            steps["rerank_model"] = _rerank_model
+        # Independent: the model load runs on the embedding thread, the tokenizer on the threadpool
+        await asyncio.gather(*(self._step(name, fn) for name, fn in steps.items()))
+        self.finished_at = time.time()
+
+    async def start(self):
+        if WARMUP_MODE == "off":
+            return
+        if WARMUP_MODE == "blocking":
+            await self.run()
+        else:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "mode": WARMUP_MODE,
+            "warmup_seconds": round(self.finished_at - self.started_at, 2) if self.finished_at else None,
+            "steps": self.steps,
+        }
+
+
+readiness = Readiness()
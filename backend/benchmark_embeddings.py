@@ -0,0 +1,111 @@
+"""
+Embedding backend benchmark: loads each backend (see EMBEDDING_BACKEND in
+app/utils/research_assistant.py) in a fresh process and prints load time,
+batch encode throughput, single-query latency and the process RSS.
+
+A fresh process per backend keeps the numbers comparable: the RSS includes
+everything the backend imports (torch for the PyTorch backend), as it would
+in a uvicorn worker.
+
+    python benchmark_embeddings.py [--backends torch,onnx] [--texts 512] [--queries 200]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+WORDS = (
+    "we propose a novel method for protein structure prediction using deep neural networks trained on "
+    "large scale genomic data and evaluate it on benchmark datasets showing improvements over prior work "
+    "in accuracy robustness and efficiency while discussing limitations and future directions"
+).split()
+
+
+def _texts(count: int, words: int, seed: int) -> list:
+    import random
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(words // 2, words))) for _ in range(count)]
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _worker(backend_name: str, texts: int, queries: int, batch_size: int, results):
+    try:
+        results.put((backend_name, _measure(backend_name, texts, queries, batch_size)))
+    except Exception as e:
+        results.put((backend_name, e))
+
+
+def _measure(backend_name: str, texts: int, queries: int, batch_size: int) -> dict:
+    from app.utils.research_assistant import create_embedding_backend
+
+    rss_start = _rss_mb()
+    started = time.perf_counter()
+    backend = create_embedding_backend(backend_name)
+    load_s = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    corpus = _texts(texts, 150, seed=1)
+    backend.encode(corpus[:batch_size], batch_size=batch_size)  # warm-up
+    started = time.perf_counter()
+    backend.encode(corpus, batch_size=batch_size)
+    batch_s = time.perf_counter() - started
+
+    latencies = []
+    for query in _texts(queries, 12, seed=2):
+        started = time.perf_counter()
+        backend.encode(query)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    return {
+        "load s": load_s,
+        "texts/s": texts / batch_s,
+        "query p50 ms": 1000 * statistics.median(latencies),
+        "query p95 ms": 1000 * latencies[int(len(latencies) * 0.95)],
+        "rss load MB": rss_loaded - rss_start,
+        "rss total MB": _rss_mb(),
+    }
+
+
+def run(backend_name: str, texts: int, queries: int, batch_size: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_worker, args=(backend_name, texts, queries, batch_size, results))
+    process.start()
+    _, row = results.get()
+    process.join()
+    if isinstance(row, Exception):
+        raise SystemExit(f"{backend_name}: {row}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", default="torch,onnx", help="comma-separated backend names")
+    parser.add_argument("--texts", type=int, default=512, help="abstract-length texts in the batch encode")
+    parser.add_argument("--queries", type=int, default=200, help="single short queries encoded one by one")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{args.texts} texts in batches of {args.batch_size}, {args.queries} single queries\n")
+    rows = {name: run(name, args.texts, args.queries, args.batch_size) for name in args.backends.split(",")}
+    columns = list(next(iter(rows.values())))
+    print(f"{'backend':<10}" + "".join(f"{c:>14}" for c in columns))
+    for name, row in rows.items():
+        print(f"{name:<10}" + "".join(f"{row[c]:>14.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+SQLite storage profile benchmark: runs the same concurrent read/write load
+against a fresh database with the "default" and the "production" profile
+(see SQLITE_PROFILE in app/database.py) and prints throughput, write latency
+and lock errors for each.
+
+Each worker process stands in for a uvicorn worker: a few reader threads page
+through a workspace's papers while one writer thread appends chat messages,
+committing once per message like the chat endpoint does.
+
+    python benchmark_sqlite.py [--workers 4] [--readers 4] [--seconds 10]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+
+def _seed(url: str):
+    from app.database import Base, create_db_engine
+    from app import models
+    from sqlalchemy.orm import Session
+
+    engine = create_db_engine(url, "default")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = models.User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(user)
+        db.flush()
+        workspace = models.Workspace(name="Bench", owner_id=user.id)
+        db.add(workspace)
+        db.flush()
+        db.add_all(
+            models.Paper(workspace_id=workspace.id, title=f"Paper {i}", authors="A", abstract="B " * 200, year=2000 + i % 25)
+            for i in range(2000)
+        )
+        conversation = models.Conversation(workspace_id=workspace.id, title="Bench")
+        db.add(conversation)
+        db.commit()
+        ids = workspace.id, conversation.id
+    engine.dispose()
+    return ids
+
+
+def _worker(url: str, profile: str, workspace_id: int, conversation_id: int, readers: int, seconds: float, results):
+    from app.database import create_db_engine
+    from app import models
+    from sqlalchemy.orm import Session
+
+    engine = create_db_engine(url, profile)
+    deadline = time.perf_counter() + seconds
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    write_latencies = []
+    lock = threading.Lock()
+
+    def read_loop():
+        while time.perf_counter() < deadline:
+            try:
+                with Session(engine) as db:
+                    db.query(models.Paper.id, models.Paper.title).filter(
+                        models.Paper.workspace_id == workspace_id
+                    ).order_by(models.Paper.id.desc()).limit(50).all()
+                with lock:
+                    counts["reads"] += 1
+            except OperationalError:
+                with lock:
+                    counts["errors"] += 1
+
+    def write_loop():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with Session(engine) as db:
+                    db.add(models.Message(conversation_id=conversation_id, role="user", content="benchmark " * 20))
+                    db.commit()
+                with lock:
+                    counts["writes"] += 1
+                    write_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                with lock:
+                    counts["errors"] += 1
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)] + [threading.Thread(target=write_loop)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    results.put((counts, write_latencies))
+
+
+def run(profile: str, workers: int, readers: int, seconds: float) -> dict:
+    directory = tempfile.mkdtemp(prefix=f"researchhub-bench-{profile}-")
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    workspace_id, conversation_id = _seed(url)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_worker, args=(url, profile, workspace_id, conversation_id, readers, seconds, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    totals = {"reads": 0, "writes": 0, "errors": 0}
+    latencies = []
+    for _ in processes:
+        counts, write_latencies = results.get()
+        for key in totals:
+            totals[key] += counts[key]
+        latencies.extend(write_latencies)
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    return {
+        "reads/s": totals["reads"] / seconds,
+        "writes/s": totals["writes"] / seconds,
+        "errors": totals["errors"],
+        "write p50 ms": 1000 * statistics.median(latencies) if latencies else 0.0,
+        "write p95 ms": 1000 * latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4, help="processes (uvicorn workers)")
+    parser.add_argument("--readers", type=int, default=4, help="reader threads per process")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{args.workers} processes x ({args.readers} readers + 1 writer), {args.seconds:.0f}s per profile\n")
+    rows = {profile: run(profile, args.workers, args.readers, args.seconds) for profile in ("default", "production")}
+    columns = list(rows["default"])
+    print(f"{'profile':<12}" + "".join(f"{c:>14}" for c in columns))
+    for profile, row in rows.items():
+        print(f"{profile:<12}" + "".join(f"{row[c]:>14.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Embedding backend parity check: encodes a fixture corpus of paper-like texts
+and queries with the PyTorch and the ONNX backend and compares the vectors.
+Exits non-zero if the two disagree by more than the tolerances, i.e. if
+stored embeddings could not be reused after switching EMBEDDING_BACKEND.
+
+Checks the cosine similarity between both backends' vector for every text,
+and that each query retrieves the same top-k papers from the corpus.
+
+    python check_embedding_parity.py [--min-cosine 0.97] [--mean-cosine 0.99]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from app.utils.research_assistant import create_embedding_backend, top_k_indices
+
+CORPUS = [
+    "Attention Is All You Need. We propose the Transformer, a network architecture based solely on attention mechanisms, dispensing with recurrence and convolutions entirely.",
+    "BERT: Pre-training of Deep Bidirectional Transformers for Language Understanding. Bidirectional encoder representations are pre-trained on unlabeled text by jointly conditioning on left and right context.",
+    "Deep Residual Learning for Image Recognition. Residual connections ease the training of networks that are substantially deeper than those used previously.",
+    "Highly accurate protein structure prediction with AlphaFold. A neural network predicts three-dimensional protein structures with atomic accuracy from the amino acid sequence.",
+    "CRISPR-Cas9 genome editing in human cells. A guide RNA directs the Cas9 nuclease to introduce double-strand breaks at specific genomic loci.",
+    "BRCA1 and BRCA2 germline variants and breast cancer risk. Pathogenic variants substantially raise lifetime risk of breast and ovarian cancer.",
+    "Single-cell RNA sequencing reveals tumour heterogeneity. Transcriptomes of thousands of individual cells identify distinct malignant and immune cell states.",
+    "Global warming of 1.5 degrees Celsius. Emission pathways consistent with limiting warming require rapid reductions in carbon dioxide and methane.",
+    "Ocean acidification and coral reef calcification. Lower carbonate saturation reduces skeletal growth rates of reef-building corals.",
+    "Observation of gravitational waves from a binary black hole merger. Two detectors measured a transient strain signal matching general relativity predictions.",
+    "A measurement of the Hubble constant from Type Ia supernovae. Calibrated distance ladders yield an expansion rate in tension with early-universe estimates.",
+    "Quantum supremacy using a programmable superconducting processor. Sampling the output of random circuits took seconds on 53 qubits.",
+    "Efficacy of an mRNA vaccine against COVID-19. In a randomized trial, two doses conferred 95 percent protection against symptomatic infection.",
+    "Gut microbiome composition and obesity. Microbial communities from obese donors increased adiposity when transplanted into germ-free mice.",
+    "Randomized trial of intensive versus standard blood-pressure control. Targeting systolic pressure below 120 mmHg reduced cardiovascular events.",
+    "Graphene: electric field effect in atomically thin carbon films. Monolayer graphite shows ambipolar conduction and high carrier mobility.",
+    "Perovskite solar cells with power conversion efficiency above 25 percent. Compositional engineering improves stability under illumination.",
+    "Lithium-ion battery cathode degradation mechanisms. Transition metal dissolution and surface reconstruction cause capacity fade over cycling.",
+    "Mastering the game of Go with deep neural networks and tree search. Policy and value networks trained by self-play defeat a human champion.",
+    "Playing Atari with deep reinforcement learning. A convolutional network trained with Q-learning learns control policies from raw pixels.",
+    "Generative adversarial networks. A generator and a discriminator are trained simultaneously in a minimax game.",
+    "Denoising diffusion probabilistic models. Image synthesis by learning to reverse a gradual noising process achieves high sample quality.",
+    "The economic effects of minimum wage increases on employment. County-pair comparisons find small effects on teen employment.",
+    "Social media use and adolescent depression. Longitudinal survey data associate heavy use with later depressive symptoms.",
+    "Deforestation in the Amazon and regional rainfall. Forest loss reduces evapotranspiration and dry-season precipitation downwind.",
+    "",
+    "x" * 5000,
+]
+
+QUERIES = [
+    "transformer self-attention language models",
+    "protein folding prediction with deep learning",
+    "breast cancer genetic risk",
+    "climate change and carbon emissions",
+    "black holes and gravitational waves",
+    "vaccine efficacy clinical trial",
+    "battery degradation",
+    "reinforcement learning for games",
+    "image generation models",
+    "labour economics and wages",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--reference", default="torch", help="backend treated as ground truth")
+    parser.add_argument("--candidate", default="onnx", help="backend under test")
+    parser.add_argument("--min-cosine", type=float, default=0.97, help="lowest acceptable per-text cosine")
+    parser.add_argument("--mean-cosine", type=float, default=0.99, help="lowest acceptable mean cosine")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--min-overlap", type=float, default=0.8, help="lowest acceptable mean top-k overlap")
+    args = parser.parse_args()
+
+    reference = create_embedding_backend(args.reference)
+    candidate = create_embedding_backend(args.candidate)
+    texts = CORPUS + QUERIES
+
+    ref_vectors = reference.encode(texts, batch_size=8)
+    cand_vectors = candidate.encode(texts, batch_size=8)
+    # Both are L2-normalized, so the row-wise dot product is the cosine similarity
+    cosines = np.einsum("ij,ij->i", ref_vectors, cand_vectors)
+    worst = int(np.argmin(cosines))
+    print(f"cosine  mean {cosines.mean():.4f}  min {cosines.min():.4f}  (worst: {texts[worst][:60]!r})")
+
+    corpus_size = len(CORPUS)
+    overlaps = []
+    for i, query in enumerate(QUERIES):
+        row = corpus_size + i
+        ref_top = set(top_k_indices(ref_vectors[:corpus_size] @ ref_vectors[row], args.top_k).tolist())
+        cand_top = set(top_k_indices(cand_vectors[:corpus_size] @ cand_vectors[row], args.top_k).tolist())
+        overlaps.append(len(ref_top & cand_top) / args.top_k)
+        if ref_top != cand_top:
+            print(f"  top-{args.top_k} differs for {query!r}: {sorted(ref_top)} vs {sorted(cand_top)}")
+    print(f"top-{args.top_k} overlap  mean {np.mean(overlaps):.3f}  min {np.min(overlaps):.3f}")
+
+    failures = []
+    if cosines.min() < args.min_cosine:
+        failures.append(f"min cosine {cosines.min():.4f} < {args.min_cosine}")
+    if cosines.mean() < args.mean_cosine:
+        failures.append(f"mean cosine {cosines.mean():.4f} < {args.mean_cosine}")
+    if np.mean(overlaps) < args.min_overlap:
+        failures.append(f"mean top-{args.top_k} overlap {np.mean(overlaps):.3f} < {args.min_overlap}")
+    if failures:
+        print(f"\n{args.candidate} does not match {args.reference}: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"\n{args.candidate} matches {args.reference}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Import-time budget check: imports app.main in a fresh interpreter with
+`python -X importtime` and exits non-zero if the import takes longer than the
+budget, or if it pulls in a heavy module that must only load during warmup or
+on first use (torch, sentence-transformers, onnxruntime, ...).
+
+Prints the slowest modules (cumulative time), so a regression points at its cause.
+
+    python check_import_time.py [--budget-ms 3000] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Loaded lazily by the embedding/rerank backends, the tokenizer and the LLM client
+DEFERRED_MODULES = {
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "onnxruntime",
+    "tokenizers",
+    "tiktoken",
+    "groq",
+    "hnswlib",
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def measure() -> list:
+    """(module, self_us, cumulative_us, depth) for every module imported by app.main."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import app.main failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "3000")))
+    parser.add_argument("--runs", type=int, default=3, help="the fastest run counts (the first may have cold caches)")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    totals = [next(cum for name, _, cum, _ in run if name == "app.main") / 1000 for run in runs]
+    best = runs[totals.index(min(totals))]
+
+    print(f"import app.main: {min(totals):.0f} ms (budget {args.budget_ms:.0f} ms; runs: "
+          + ", ".join(f"{t:.0f}" for t in totals) + ")\n")
+    top_level = sorted((m for m in best if m[3] <= 1), key=lambda m: -m[2])[:args.top]
+    for name, _, cumulative, _ in top_level:
+        print(f"{cumulative / 1000:>8.1f} ms  {name}")
+
+    failures = []
+    imported = {name.split(".")[0] for name, _, _, _ in best}
+    for module in sorted(DEFERRED_MODULES & imported):
+        chain = [name for name, _, _, _ in best if name.split(".")[0] == module]
+        failures.append(f"{module} is imported at startup ({chain[-1]})")
+    if min(totals) > args.budget_ms:
+        failures.append(f"import took {min(totals):.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
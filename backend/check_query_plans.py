@@ -0,0 +1,173 @@
+"""
+Query plan check: drives every router against a freshly migrated SQLite
+database, captures the SQL they emit and runs EXPLAIN QUERY PLAN on each
+statement. Exits non-zero if any query falls back to a full table scan, or
+if any request fails (a plan is only checked on the path that succeeded).
+
+    python check_query_plans.py
+"""
+import hashlib
+import os
+import re
+import sys
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="researchhub-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'plans.db')}"
+os.environ["EMBEDDING_STORE_DIR"] = os.path.join(_tmp, "embeddings")
+os.environ["SEARCH_CACHE_PATH"] = ""
+
+import numpy as np
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import database, models
+from app.auth import create_access_token, hash_password
+from app.main import app
+from app.utils import research_assistant
+from app.utils.llm import get_llm_client
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+class _HashEmbedder:
+    """Deterministic stand-in for the sentence-transformers model (no download needed)."""
+
+    def encode(self, texts, **kwargs):
+        def one(text):
+            seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).normal(size=384).astype(np.float32)
+            return vector / np.linalg.norm(vector)
+        return np.vstack([one(t) for t in texts]) if isinstance(texts, list) else one(texts)
+
+
+class _FakeLLM:
+    """Minimal AsyncGroq look-alike returning a canned completion."""
+
+    class _Completions:
+        async def create(self, **kwargs):
+            message = type("Message", (), {"content": "ok"})
+            return type("Completion", (), {"choices": [type("Choice", (), {"message": message})]})
+
+    def __init__(self):
+        self.chat = type("Chat", (), {"completions": self._Completions()})
+
+
+def exercise_routes(client: TestClient, headers: dict, workspace_id: int):
+    client.post("/auth/register", json={"email": "new@example.com", "username": "new", "password": "pw"})
+    client.post("/auth/login", json={"email": "plans@example.com", "password": "pw"})
+    client.get("/auth/me", headers=headers)
+
+    client.get("/workspaces/", headers=headers)
+    client.get(f"/workspaces/{workspace_id}", headers=headers)
+
+    paper = client.post("/papers/import", headers=headers, json={
+        "workspace_id": workspace_id, "title": "Single", "authors": "A", "abstract": "B", "external_id": "W1",
+    }).json()
+    client.post("/papers/import/bulk", headers=headers, json=[
+        {"workspace_id": workspace_id, "title": f"Bulk {i}", "authors": "A", "abstract": "B",
+         "external_id": f"W{i}", "doi": f"10.1/{i}", "year": 2000 + i % 3 if i % 4 else None}
+        for i in range(1, 6)
+    ])
+    papers = client.get(f"/papers/workspace/{workspace_id}", headers=headers, params={"limit": 2}).json()
+    client.get(f"/papers/workspace/{workspace_id}", headers=headers, params={"cursor": papers["next_cursor"]})
+    by_year = client.get(f"/papers/workspace/{workspace_id}", headers=headers, params={
+        "sort": "year", "limit": 2, "fields": "summary", "year_from": 1990,
+    }).json()
+    client.get(f"/papers/workspace/{workspace_id}", headers=headers, params={
+        "sort": "year", "cursor": by_year["next_cursor"], "source": "openalex",
+    })
+
+    client.get(f"/papers/workspace/{workspace_id}/search", headers=headers, params={"q": "bulk"})
+
+    client.post("/chat/", headers=headers, json={"workspace_id": workspace_id, "message": "summary?"})
+    reply = client.post("/chat/", headers=headers, json={"workspace_id": workspace_id, "message": "methods?"}).json()
+    client.post("/chat/", headers=headers, json={
+        "workspace_id": workspace_id, "message": "and results?", "conversation_id": reply["conversation_id"],
+    })
+    history = client.get(f"/chat/history/{workspace_id}", headers=headers, params={"limit": 1}).json()
+    client.get(f"/chat/history/{workspace_id}", headers=headers, params={"cursor": history["next_cursor"]})
+    messages = client.get(
+        f"/chat/conversation/{reply['conversation_id']}/messages", headers=headers, params={"limit": 1}
+    ).json()
+    client.get(
+        f"/chat/conversation/{reply['conversation_id']}/messages", headers=headers,
+        params={"cursor": messages["next_cursor"]},
+    )
+
+    client.delete(f"/papers/{paper['id']}", headers=headers)
+    client.delete(f"/chat/conversation/{reply['conversation_id']}", headers=headers)
+    client.delete(f"/workspaces/{workspace_id}", headers=headers)
+
+
+def main() -> int:
+    if not database.DATABASE_URL.startswith("sqlite"):
+        print("Query plan check only supports SQLite")
+        return 1
+
+    command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")), "head")
+    research_assistant._model = _HashEmbedder()
+    app.dependency_overrides[get_llm_client] = _FakeLLM
+
+    db = database.SessionLocal()
+    user = models.User(email="plans@example.com", username="plans", hashed_password=hash_password("pw"))
+    db.add(user)
+    db.commit()
+    workspace = models.Workspace(name="Plans", owner_id=user.id)
+    db.add(workspace)
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    workspace_id = workspace.id
+    db.close()
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    # Request handlers run on the async engine (unless DB_ASYNC=false), index work on the sync one
+    engines = [database.engine]
+    if database.async_engine is not None:
+        engines.append(database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", capture)
+    failed_requests = []
+
+    def check_status(response):
+        if not response.is_success:
+            response.read()
+            failed_requests.append(f"{response.request.method} {response.request.url.path} -> "
+                                   f"{response.status_code} {response.text[:200]}")
+
+    with TestClient(app) as client:
+        client.event_hooks["response"] = [check_status]
+        exercise_routes(client, headers, workspace_id)
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    failures = []
+    raw = database.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement in dict.fromkeys(s for s, _ in captured):
+            parameters = next(p for s, p in captured if s == statement)
+            plan = cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            scans = [row[3] for row in plan if FULL_SCAN.match(row[3])]
+            if scans:
+                failures.append((statement, scans))
+    finally:
+        raw.close()
+
+    print(f"Checked {len(set(s for s, _ in captured))} distinct statements")
+    for request in failed_requests:
+        print(f"\nREQUEST FAILED: {request}")
+    for statement, scans in failures:
+        print(f"\nFULL TABLE SCAN ({', '.join(scans)}):\n  {' '.join(statement.split())}")
+    return 1 if failures or failed_requests else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
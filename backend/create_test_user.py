@@ -1,9 +1,12 @@
-from app.database import SessionLocal, engine
-from app.models import Base, User
+from alembic import command
+from alembic.config import Config
+
+from app.database import SessionLocal
+from app.models import User
 from app.auth import hash_password
 
 def create_test_user():
-    Base.metadata.create_all(bind=engine)
+    command.upgrade(Config("alembic.ini"), "head")
     db = SessionLocal()
     
     # Clean output by deleting existing test user first to ensure fresh state
@@ -0,0 +1,70 @@
+"""
+Export the embedding model (all-MiniLM-L6-v2) to ONNX and quantize its
+weights to int8, for EMBEDDING_BACKEND=onnx (see app/utils/research_assistant.py).
+Needs torch, transformers, onnx and onnxruntime; the API server itself then
+only needs onnxruntime and tokenizers.
+
+Writes model.onnx, model_quantized.onnx and the tokenizer files to the output
+directory (EMBEDDING_ONNX_DIR by default). Verify the result with
+check_embedding_parity.py.
+
+    python export_onnx_embedding.py [--output ./models/all-MiniLM-L6-v2-onnx-int8]
+"""
+import argparse
+import os
+
+from app.utils.research_assistant import EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_DIR
+
+# sentence-transformers checkpoints live under this organization on the Hugging Face hub
+HUB_ORGANIZATION = "sentence-transformers"
+
+
+def export(output_dir: str, opset: int = 17):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_id = f"{HUB_ORGANIZATION}/{EMBEDDING_MODEL_NAME}"
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id).eval()
+    # Writes tokenizer.json (the fast tokenizer) that OnnxEmbeddingBackend loads
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["an example sentence", "another one"], padding=True, return_tensors="pt")
+    inputs = (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"])
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            inputs,
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in names},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+    # Dynamic quantization: int8 weights, activations quantized on the fly per batch
+    quantized_path = os.path.join(output_dir, "model_quantized.onnx")
+    quantize_dynamic(fp32_path, quantized_path, weight_type=QuantType.QInt8, per_channel=True)
+
+    for path in (fp32_path, quantized_path):
+        print(f"{path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=EMBEDDING_ONNX_DIR, help="output directory")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.output, args.opset)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ export default function WorkspaceDetail() {
 
     const [workspace, setWorkspace] = useState<Workspace | null>(null)
     const [papers, setPapers] = useState<Paper[]>([])
+    const [papersCursor, setPapersCursor] = useState<string | undefined>()
+    const [paperCount, setPaperCount] = useState(0)
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState('')
     const [deleteId, setDeleteId] = useState<number | null>(null)
@@ -31,7 +33,9 @@ export default function WorkspaceDetail() {
                     paperApi.list(workspaceId),
                 ])
                 setWorkspace(ws)
-                setPapers(papersData)
+                setPaperCount(ws.paper_count)
+                setPapers(papersData.items)
+                setPapersCursor(papersData.next_cursor)
             } catch {
                 setError('Failed to load workspace')
             } finally {
@@ -49,6 +53,7 @@ export default function WorkspaceDetail() {
         try {
             await paperApi.delete(paperId)
             setPapers((prev) => prev.filter((p) => p.id !== paperId))
+            setPaperCount((prev) => prev - 1)
         } catch {
             setError('Failed to delete paper')
         } finally {
@@ -56,6 +61,17 @@ export default function WorkspaceDetail() {
         }
     }
 
+    const loadMorePapers = async () => {
+        if (!papersCursor) return
+        try {
+            const page = await paperApi.list(workspaceId, papersCursor)
+            setPapers((prev) => [...prev, ...page.items])
+            setPapersCursor(page.next_cursor)
+        } catch {
+            setError('Failed to load papers')
+        }
+    }
+
     const handleSendMessage = async () => {
         if (!input.trim() || chatLoading) return
         const userMsg = input.trim()
@@ -89,15 +105,18 @@ export default function WorkspaceDetail() {
     const loadHistory = async () => {
         try {
             const hist = await chatApi.history(workspaceId)
-            setConversations(hist)
+            setConversations(hist.items)
             setShowHistory(true)
         } catch { /* ignore */ }
     }
 
-    const loadConversation = (conv: Conversation) => {
-        setConversationId(conv.id)
-        setMessages(conv.messages)
-        setShowHistory(false)
+    const loadConversation = async (conv: Conversation) => {
+        try {
+            const page = await chatApi.messages(conv.id)
+            setConversationId(conv.id)
+            setMessages(page.items)
+            setShowHistory(false)
+        } catch { /* ignore */ }
     }
 
     const newChat = () => {
@@ -138,7 +157,7 @@ export default function WorkspaceDetail() {
                         {workspace?.description && <p className="text-gray-400 mt-1">{workspace.description}</p>}
                         <div className="flex items-center gap-4 mt-2">
                             <span className="badge bg-brand-500/20 text-brand-400 border border-brand-500/30">
-                                📄 {papers.length} papers
+                                📄 {paperCount} papers
                             </span>
                             <span className="text-xs text-gray-600">Created {new Date(workspace?.created_at || '').toLocaleDateString()}</span>
                         </div>
@@ -228,6 +247,11 @@ export default function WorkspaceDetail() {
                         ))}
                     </div>
                 )}
+                {papersCursor && (
+                    <div className="text-center mt-6">
+                        <button onClick={loadMorePapers} className="btn-secondary">Load more papers</button>
+                    </div>
+                )}
 
                 {/* AI Chat Panel */}
                 {chatOpen && (
@@ -241,7 +265,7 @@ export default function WorkspaceDetail() {
                                     </div>
                                     <div>
                                         <p className="text-sm font-semibold text-white">ResearchHub AI</p>
-                                        <p className="text-xs text-gray-500">{papers.length} papers in context • Llama 3.3 70B</p>
+                                        <p className="text-xs text-gray-500">{paperCount} papers in context • Llama 3.3 70B</p>
                                     </div>
                                 </div>
                                 <div className="flex items-center gap-2">
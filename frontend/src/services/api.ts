@@ -83,7 +83,14 @@ export interface Conversation {
     title: string
     created_at: string
     workspace_id: number
-    messages: Message[]
+    message_count: number
+    last_message_preview?: string
+    last_message_at?: string
+}
+
+export interface Page<T> {
+    items: T[]
+    next_cursor?: string
 }
 
 // ─── Auth ─────────────────────────────────────────────────────────────────────
@@ -144,9 +151,33 @@ export const paperApi = {
         const res = await api.post('/papers/import', data)
         return res.data as Paper
     },
-    list: async (workspaceId: number) => {
-        const res = await api.get(`/papers/workspace/${workspaceId}`)
-        return res.data as Paper[]
+    importBulk: async (papers: Array<{
+        workspace_id: number
+        title: string
+        authors: string
+        abstract: string
+        year?: number
+        doi?: string
+        url?: string
+        source?: string
+        external_id?: string
+    }>) => {
+        const res = await api.post('/papers/import/bulk', papers)
+        return res.data as {
+            created: number
+            duplicates: number
+            errors: number
+            results: { index: number; status: 'created' | 'duplicate' | 'error'; paper?: Paper; detail?: string }[]
+        }
+    },
+    searchLibrary: async (workspaceId: number, q: string, limit = 20) => {
+        const res = await api.get(`/papers/workspace/${workspaceId}/search`, { params: { q, limit } })
+        // snippet is HTML-escaped with matches wrapped in <mark>
+        return res.data as { id: number; title: string; authors: string; year?: number; source: string; score?: number; snippet?: string }[]
+    },
+    list: async (workspaceId: number, cursor?: string) => {
+        const res = await api.get(`/papers/workspace/${workspaceId}`, { params: { cursor } })
+        return res.data as Page<Paper>
     },
     delete: async (paperId: number) => {
         await api.delete(`/papers/${paperId}`)
@@ -164,9 +195,13 @@ export const chatApi = {
         })
         return res.data as { conversation_id: number; reply: string }
     },
-    history: async (workspaceId: number) => {
-        const res = await api.get(`/chat/history/${workspaceId}`)
-        return res.data as Conversation[]
+    history: async (workspaceId: number, cursor?: string) => {
+        const res = await api.get(`/chat/history/${workspaceId}`, { params: { cursor } })
+        return res.data as Page<Conversation>
+    },
+    messages: async (conversationId: number, cursor?: string) => {
+        const res = await api.get(`/chat/conversation/${conversationId}/messages`, { params: { cursor } })
+        return res.data as Page<Message>
     },
     deleteConversation: async (conversationId: number) => {
         await api.delete(`/chat/conversation/${conversationId}`)